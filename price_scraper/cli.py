@@ -1,137 +1,220 @@
 import argparse
-import json
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, MISSING
 import logging
 import os
-from typing import Any, Dict, List, TYPE_CHECKING
+import sys
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Tuple,
+    TYPE_CHECKING,
+    get_args,
+    get_origin,
+)
 
-from pydantic import BaseModel, Field
-from pydantic_core import PydanticUndefined
+# NOTE use orjson to parse JSON config when installed, it is faster than stdlib json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment]
 
 from price_scraper.enums import Retailer, StorageType
-from price_scraper.retailer.base import BaseRetailer
 
+if TYPE_CHECKING:
+    from price_scraper.retailer.base import BaseRetailer
+    from price_scraper.storage.base import BaseStorage
 
-logging_level = getattr(logging, os.environ.get("LOG_LEVEL", "INFO"))
 
-# lambda runtime logging level set
-if len(logging.getLogger().handlers) > 0:
-    logging.getLogger().setLevel(logging_level)
-# local interpreter logging config
-else:
-    logging.basicConfig(
-        level=logging_level, format="%(asctime)s - %(levelname)s - %(message)s"
-    )
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+# NOTE dataclass slots are only supported from python 3.10
+_DATACLASS_KWARGS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
-class StorageOptions(BaseModel):
+def configure_logging():
+    """Configures the root logging level and format from the LOG_LEVEL env var.
+    It is called by the CLI entrypoint, other entrypoints (e.g. a lambda handler) should call it
+    explicitly, since importing the module does not touch logging configuration.
+    """
+    logging_level = getattr(logging, os.environ.get("LOG_LEVEL", "INFO"))
+
+    # lambda runtime logging level set
+    if len(logging.getLogger().handlers) > 0:
+        logging.getLogger().setLevel(logging_level)
+    # local interpreter logging config
+    else:
+        logging.basicConfig(
+            level=logging_level, format="%(asctime)s - %(levelname)s - %(message)s"
+        )
+
+
+@dataclass(**_DATACLASS_KWARGS)
+class StorageOptions:
     """Storage schema provided by the user."""
 
-    storage_type: StorageType = Field(
-        ...,
-        description=(
-            "The type of storage to use, must be a valid "
-            "StorageType enum supported by the library."
-        ),
+    storage_type: StorageType = field(
+        metadata={
+            "help": (
+                "The type of storage to use, must be a valid "
+                "StorageType enum supported by the library."
+            )
+        },
     )
-    storage_options: Dict[str, Any] = Field(
-        {}, description="The keyword argument of specific StorageType class."
+    storage_options: Dict[str, Any] = field(
+        default_factory=dict,
+        metadata={"help": "The keyword argument of specific StorageType class."},
     )
 
+    def __post_init__(self):
+        self.storage_type = StorageType.validate(self.storage_type)
+
 
-class PriceScraperSchema(BaseModel):
+@dataclass(**_DATACLASS_KWARGS)
+class PriceScraperSchema:
     """Schema for PriceScraper CLI."""
 
-    retailer: Retailer = Field(
-        ...,
-        description="The retailer enum. Must be valid Retailer enum supported by the library.",
+    retailer: Retailer = field(
+        metadata={
+            "help": "The retailer enum. Must be valid Retailer enum supported by the library."
+        },
     )
-    url: str = Field(
-        ...,
-        description=(
-            "URL of page to scrape. URL must contain all elements "
-            "dedicated to a certain brand and category."
-        ),
+    url: str = field(
+        metadata={
+            "help": (
+                "URL of page to scrape. URL must contain all elements "
+                "dedicated to a certain brand and category."
+            )
+        },
     )
-    category: str = Field(
-        ...,
-        description=(
-            "The name of category the page is for. "
-            "Currently assumes the list of products all belong "
-            "to a specific category. Category string can be nested separated by '/'."
-        ),
+    category: str = field(
+        metadata={
+            "help": (
+                "The name of category the page is for. "
+                "Currently assumes the list of products all belong "
+                "to a specific category. Category string can be nested separated by '/'."
+            )
+        },
     )
-    brand: str = Field(
-        ...,
-        description=(
-            "The name of brand the page is for. "
-            "Currently assumes the list of products all belong "
-            "to a specific brand."
-        ),
+    brand: str = field(
+        metadata={
+            "help": (
+                "The name of brand the page is for. "
+                "Currently assumes the list of products all belong "
+                "to a specific brand."
+            )
+        },
+    )
+    storage_config: List[StorageOptions] = field(
+        metadata={
+            "help": (
+                "The storage class and config to use, "
+                "must have storage_type key with StorageType enum value, "
+                "and optionally can have storage_options for storage class configuration. "
+                "User can configure multiple storage as part of writing scarped data."
+            )
+        },
     )
-    storage_config: List[StorageOptions] = Field(
-        ...,
-        description=(
-            "The storage class and config to use, "
-            "must have storage_class key with StorageType enum value, "
-            "and optionally can have storage_kwargs for storage_cls configuration. "
-            "User can configure multiple storage as part of writing scarped data."
-        ),
+    proxy_config: dict = field(
+        default_factory=dict,
+        metadata={
+            "help": "Selenium Firefox proxy configuration given as key value pair."
+        },
     )
-    proxy_config: dict = Field(
-        {},
-        description="Selenium Firefox proxy configuration given as key value pair.",
+    timeout: int = field(
+        default=30, metadata={"help": "Web loading timeout in seconds."}
     )
-    timeout: int = Field(
-        30, description="Web loading timeout in seconds.", required=False
+    max_workers: int = field(
+        default=4,
+        metadata={
+            "help": "The maximum number of web browsers loading retailer pages concurrently."
+        },
     )
+    fast_path: bool = field(
+        default=False,
+        metadata={
+            "help": (
+                "Fetch server rendered retailer pages over plain HTTP instead of the web "
+                "browser when supported, falling back to the browser on failure. "
+                "Requires the fast extra."
+            )
+        },
+    )
+
+    # The CLI flag and argparse keyword arguments of each field, built on first use
+    _field_spec: ClassVar[List[Tuple[str, Dict[str, Any]]]]
+
+    def __post_init__(self):
+        self.retailer = Retailer.validate(self.retailer)
+        self.storage_config = [
+            conf if isinstance(conf, StorageOptions) else StorageOptions(**conf)
+            for conf in self.storage_config
+        ]
+
+    @classmethod
+    def _get_field_spec(cls) -> List[Tuple[str, Dict[str, Any]]]:
+        """Returns the CLI flag and argparse keyword arguments of each schema field.
+        The spec is built once per class, so repeated parser creation skips walking the fields.
+        """
+        if "_field_spec" not in cls.__dict__:
+            field_spec = []
+            for f in fields(cls):
+                type_ = f.type
+                default = f.default
+                if f.default_factory is not MISSING:
+                    default = f.default_factory()
+                kwargs: Dict[str, Any] = {
+                    "required": default is MISSING,
+                    "help": f.metadata.get("help"),
+                }
+                # if a List type hint make necessary adjustments
+                if get_origin(type_) is list:
+                    kwargs.update({"nargs": "+"})
+                    type_ = get_args(type_)[0]
+                if default is not MISSING:
+                    kwargs.update({"default": default})
+                # NOTE bool flags are switches, argparse would parse any non empty string as True
+                if type_ is bool:
+                    kwargs.update({"action": "store_true"})
+                    field_spec.append((f"--{f.name.replace('_', '-')}", kwargs))
+                    continue
+                # NOTE anything non int, float would be treated as string input in the CLI
+                if type_ not in (int, float):
+                    type_ = str
+                    if kwargs.get("default") is not None:
+                        kwargs.update({"default": str(default)})
+                kwargs.update({"type": type_})
+                field_spec.append((f"--{f.name.replace('_', '-')}", kwargs))
+            cls._field_spec = field_spec
+        return cls._field_spec
 
     @classmethod
     def create_arg_parser(cls) -> argparse.Namespace:
         parser = argparse.ArgumentParser(
             description="Scrape a given retail website page for its product prices and reviews."
         )
-        for field_name, field in cls.model_fields.items():
-            kwargs = {}
-            # import pdb; pdb.set_trace()
-            type_ = field.annotation
-            default = field.default
-            # if a List type hint make necessary adjustments
-            if (
-                hasattr(field.annotation, "__origin__")
-                and field.annotation.__origin__ == list
-            ):
-                kwargs.update({"nargs": "+"})
-                type_ = field.annotation.__args__[0]
-            if default != PydanticUndefined:
-                kwargs.update({"default": default})
-            # NOTE anything non int, bool, float would be treated as string input in the CLI
-            if type_ not in (int, float, bool):
-                type_ = str
-                if kwargs.get("default") is not None:
-                    default = str(default)
-                    kwargs.update({"default": default})
-            parser.add_argument(
-                f"--{field_name.replace('_', '-')}",
-                type=type_,
-                required=field.is_required(),
-                help=field.description,
-                **kwargs,
-            )
+        for flag, kwargs in cls._get_field_spec():
+            parser.add_argument(flag, **kwargs)
         return parser.parse_args()
 
 
-def scrape(event: PriceScraperSchema, **kwargs) -> BaseRetailer:
+def scrape(event: PriceScraperSchema, **kwargs) -> "BaseRetailer":
     """The handler processing scraping event.
 
     Args:
         event: input scraping schema provided by the user.
     """
-    scraper: BaseRetailer = Retailer(event.retailer).load()(
+    # NOTE the class resolution is cached by enum value for the process lifetime,
+    # so warm runtimes handling repeated events skip the module import
+    scraper: "BaseRetailer" = event.retailer.load()(
         category=event.category.strip("/"),
         brand=event.brand.lower(),
         timeout=event.timeout,
         proxy_kwargs=event.proxy_config,
+        max_workers=event.max_workers,
+        fast_path=event.fast_path,
         **kwargs,
     )
     # scrape product data
@@ -143,42 +226,71 @@ def scrape(event: PriceScraperSchema, **kwargs) -> BaseRetailer:
     return scraper
 
 
-def store(scraper: BaseRetailer, event: PriceScraperSchema, **kwargs):
+def _save_one(storage_config: StorageOptions, scraper: "BaseRetailer"):
+    """Stores scraped data into a single storage.
+
+    Args:
+        storage_config: The storage class and config to use.
+        scraper: The scraper class for the retailer that contains scraped products.
+    """
+    storage_name = storage_config.storage_type.name
+    storage: "BaseStorage | None" = None
+    try:
+        storage_cls: "type[BaseStorage]" = storage_config.storage_type.load()
+        storage = storage_cls(**storage_config.storage_options)
+        storage.save(
+            product_prices=scraper.product_prices,
+            product_metadata=scraper.product_metadata,
+        )
+        logger.info("Finished storing data into %s.", storage.__class__.__name__)
+    except Exception as err:
+        logger.error(
+            "Error on storing data to %s: %s", storage_name, err, exc_info=True
+        )
+    finally:
+        if storage is not None:
+            storage.close()
+
+
+def store(scraper: "BaseRetailer", event: PriceScraperSchema, **kwargs):
     """The handler processing storing scraped data.
+    Storages are written concurrently since each save is independent and network bound.
 
     Args:
         scraper: The scraper class for the retailer that contains scraped products.
         event: input scraping schema provided by the user.
     """
+    if not event.storage_config:
+        return
     # store product data
-    for storage_config in event.storage_config:
-        try:
-            storage = StorageType(storage_config.storage_type).load()(
-                **storage_config.storage_options
-            )
-            storage.save(
-                product_prices=scraper.product_prices,
-                product_metadata=scraper.product_metadata,
-            )
-            logger.info("Finished storing data into %s.", storage.__class__.__name__)
-            storage.session.close()
-        except Exception as err:
-            logger.error(
-                "Error on storing data to %s: %s", storage.__class__.__name__, err, exc_info=True
-            )
+    # NOTE each storage creates its own session inside the worker thread
+    with ThreadPoolExecutor(max_workers=len(event.storage_config)) as pool:
+        futures = [
+            pool.submit(_save_one, storage_config, scraper)
+            for storage_config in event.storage_config
+        ]
+        for future in as_completed(futures):
+            future.result()
 
 
 def main():
     """The entry function to the CLI."""
+    # NOTE parse arguments first so --help and bad arguments return before
+    # any retailer/storage module (selenium, sqlalchemy) is imported
     args = PriceScraperSchema.create_arg_parser()
+    configure_logging()
     event = PriceScraperSchema(
         retailer=args.retailer,
         url=args.url,
         category=args.category,
         brand=args.brand,
-        storage_config=[json.loads(conf) for conf in args.storage_config],
-        proxy_config=json.loads(args.proxy_config),
+        storage_config=[
+            StorageOptions(**json_loads(conf)) for conf in args.storage_config
+        ],
+        proxy_config=json_loads(args.proxy_config),
         timeout=args.timeout,
+        max_workers=args.max_workers,
+        fast_path=args.fast_path,
     )
     scraper = scrape(event=event)
     store(scraper=scraper, event=event)
@@ -1,34 +1,60 @@
 from enum import Enum
-from pydoc import locate
+from functools import lru_cache
+from importlib import import_module
+from types import MappingProxyType
+from typing import ClassVar, Mapping
+
+
+@lru_cache(maxsize=None)
+def _resolve(path: str):
+    """Imports and returns the class given its full module path.
+
+    Args:
+        path: The dotted path of the class, e.g. "price_scraper.retailer.Amazon".
+    """
+    module_path, _, cls_name = path.rpartition(".")
+    return getattr(import_module(module_path), cls_name)
 
 
 class BaseEnum(Enum):
     """The base enum for shared functionality."""
 
+    # The read-only enum name to member table and the supported names, built on first lookup
+    _lookup: ClassVar[Mapping[str, "BaseEnum"]]
+    _names_csv: ClassVar[str]
+
     @classmethod
-    def __getitem__(cls, name):
-        if name not in cls.__members__:
-            acceptable_values = ", ".join(cls.__members__.keys())
-            raise ValueError(
-                f"No such enum: {name}. Supported enum are: {acceptable_values}"
-            )
-        return super().__getitem__(name)
+    def _get_lookup(cls) -> Mapping[str, "BaseEnum"]:
+        """Returns the read-only enum name to member table, built once per enum class.
+
+        NOTE this is not built in __init_subclass__, since before Python 3.11 enum members are
+        not populated yet when it runs.
+        """
+        if "_lookup" not in cls.__dict__:
+            cls._lookup = MappingProxyType(dict(cls.__members__))
+            cls._names_csv = ", ".join(cls.__members__)
+        # NOTE read off the class dict, as older mypy versions type enum class vars as members
+        return cls.__dict__["_lookup"]
 
     @classmethod
-    def __get_validators__(cls):
-        cls.lookup = {v: k.value for v, k in cls.__members__.items()}
-        yield cls.validate
+    def __getitem__(cls, name):
+        try:
+            return cls._get_lookup()[name]
+        except KeyError:
+            raise ValueError(
+                f"No such enum: {name}. Supported enum are: {cls._names_csv}"
+            ) from None
 
     def load(self):
         """Loads the class associated with module path in the enum value."""
-        return locate(self.value)
+        return _resolve(self.value)
 
     @classmethod
-    def validate(cls, v, *args):
-        try:
-            return cls.lookup[v]
-        except KeyError:
-            raise ValueError("invalid value")
+    def validate(cls, v):
+        """Validates the enum name, or enum member, and returns the enum member."""
+        if isinstance(v, cls):
+            return v
+        return cls.__getitem__(v)
 
 
 class Retailer(BaseEnum):
@@ -1,6 +1,9 @@
+from dataclasses import dataclass, field, fields
 from datetime import date
+from itertools import islice
+from operator import attrgetter
 import uuid
-from typing import Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from sqlalchemy import (
     Column,
@@ -8,11 +11,13 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
+    insert,
     Integer,
     JSON,
     String,
 )
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import declarative_base, relationship, Session
 
 from price_scraper.enums import Retailer
 
@@ -37,6 +42,12 @@ class ProductMetadata(Base):
     """
 
     __tablename__ = "product_metadata"
+    # NOTE indexes are only created in postgres for efficient queries at read, the analytical
+    # storages scan the tables in full
+    __table_args__ = (
+        Index("idx_product_metadata_category", "category").ddl_if(dialect="postgresql"),
+        Index("idx_product_metadata_brand", "brand").ddl_if(dialect="postgresql"),
+    )
 
     product_id = Column(String, primary_key=True)
     retailer = Column(Enum(Retailer), nullable=False)
@@ -61,12 +72,20 @@ class ProductPrice(Base):
     """
 
     __tablename__ = "product_price"
+    __table_args__ = (
+        Index("idx_product_price_date_product_id", "date", "product_id").ddl_if(
+            dialect="postgresql"
+        ),
+        Index("idx_product_price_product_id", "product_id").ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     product_id = Column(
         String, ForeignKey("product_metadata.product_id"), nullable=False
     )
-    date = Column(Date, nullable=False, default=lambda: date.today())
+    date = Column(Date, nullable=False, default=date.today)
     buy_price = Column(Float, nullable=True)
     original_price = Column(Float, nullable=True)
     coupon_value = Column(Float, nullable=True)
@@ -74,3 +93,86 @@ class ProductPrice(Base):
     review_count = Column(Integer, nullable=True)
 
     product_metadata = relationship("ProductMetadata")
+
+    @classmethod
+    def bulk_insert(
+        cls, session: Session, rows: Iterable[dict], batch_size: int = 1000
+    ):
+        """Inserts product price rows with executemany INSERT statements,
+        instead of flushing an ORM instance per row.
+
+        Rows are consumed in chunks of batch_size, so a generator of rows can be streamed
+        without materializing every row and statement parameter at once.
+
+        Args:
+            session: The database session to execute the insert with.
+            rows: The product price rows keyed by column name.
+            batch_size: The maximum number of rows per INSERT statement.
+        """
+        iterator = iter(rows)
+        while batch := list(islice(iterator, batch_size)):
+            session.execute(insert(cls), batch)
+
+
+# The column names and column lists getter of each batch class, computed on first use
+_BATCH_COLUMNS: Dict[type, Tuple[Tuple[str, ...], Callable[[Any], tuple]]] = {}
+
+
+def _batch_columns(cls: type) -> Tuple[Tuple[str, ...], Callable[[Any], tuple]]:
+    """Gets the column names of the batch class and a getter of all its column lists at once,
+    computed once per class instead of looking up the dataclass fields on every call.
+
+    NOTE the cache is a dict keyed on the class instead of lru_cache, whose arguments mypy
+    rejects for dataclass types, as it checks them against the unhashable instances.
+    """
+    if cls not in _BATCH_COLUMNS:
+        names = tuple(f.name for f in fields(cls))
+        _BATCH_COLUMNS[cls] = names, attrgetter(*names)
+    return _BATCH_COLUMNS[cls]
+
+
+class _ColumnBatch:
+    """Rows stored as one list per column, so scraped rows are appended as scalars and handed
+    to storages column by column, instead of building a dict or ORM instance per row.
+    """
+
+    def __len__(self) -> int:
+        names, _ = _batch_columns(type(self))
+        return len(getattr(self, names[0]))
+
+    def columns(self) -> Dict[str, list]:
+        """Returns the column lists keyed by column name, without copying them."""
+        names, get_columns = _batch_columns(type(self))
+        return dict(zip(names, get_columns(self)))
+
+    def rows(self) -> Iterator[dict]:
+        """Yields the rows keyed by column name, e.g. as INSERT statement parameters."""
+        names, get_columns = _batch_columns(type(self))
+        for values in zip(*get_columns(self)):
+            yield dict(zip(names, values))
+
+
+@dataclass
+class ProductMetadataBatch(_ColumnBatch):
+    """The scraped ProductMetadata rows, one list per column."""
+
+    product_id: List[str] = field(default_factory=list)
+    retailer: List[Retailer] = field(default_factory=list)
+    brand: List[str] = field(default_factory=list)
+    category: List[str] = field(default_factory=list)
+    title: List[Optional[str]] = field(default_factory=list)
+    additional_attributes: List[Optional[dict]] = field(default_factory=list)
+
+
+@dataclass
+class ProductPriceBatch(_ColumnBatch):
+    """The scraped ProductPrice rows, one list per column."""
+
+    id: List[str] = field(default_factory=list)
+    product_id: List[str] = field(default_factory=list)
+    date: List[date] = field(default_factory=list)
+    buy_price: List[Optional[float]] = field(default_factory=list)
+    original_price: List[Optional[float]] = field(default_factory=list)
+    coupon_value: List[Optional[float]] = field(default_factory=list)
+    rating: List[Optional[float]] = field(default_factory=list)
+    review_count: List[Optional[int]] = field(default_factory=list)
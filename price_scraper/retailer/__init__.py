@@ -1,9 +1,33 @@
-from .amazon import Amazon
-from .base import BaseRetailer
-from .best_buy import BestBuy
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .amazon import Amazon
+    from .base import BaseRetailer
+    from .best_buy import BestBuy
 
 __all__ = [
     "Amazon",
     "BaseRetailer",
     "BestBuy",
 ]
+
+# NOTE retailer modules import selenium, so they are only loaded on first attribute access
+_SUBMODULES = {
+    "Amazon": "amazon",
+    "BaseRetailer": "base",
+    "BestBuy": "best_buy",
+}
+
+
+def __getattr__(name: str):
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_SUBMODULES[name]}", __name__), name)
+    # cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
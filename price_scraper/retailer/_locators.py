@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Tuple
+
+from selenium.webdriver.common.by import By
+
+
+@lru_cache(maxsize=64)
+def locator(selector: str) -> Tuple[str, str]:
+    """Gets the CSS selector locator given to Selenium find_element(s), built once per selector.
+
+    Args:
+        selector: The CSS selector.
+
+    Returns:
+        locator: The locator strategy and value, unpacked as find_element(s) arguments.
+    """
+    return By.CSS_SELECTOR, selector
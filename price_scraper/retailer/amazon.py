@@ -2,22 +2,112 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import List, TYPE_CHECKING
 
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from price_scraper.enums import Retailer
 from price_scraper.retailer.base import BaseRetailer
 
-if TYPE_CHECKING:
-    from selenium.webdriver.remote.webelement import WebElement
-
-
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+# Regular expression to match the pattern /dp/ followed by the product ID
+_DP_RE = re.compile(r"/dp/([^/?]+)")
+# Non-numeric characters of a price string
+_NUM_STRIP_RE = re.compile(r"[^\d.]")
+# Translation table deleting non-numeric latin-1 characters, a faster path than _NUM_STRIP_RE
+_PRICE_TBL = str.maketrans(
+    "", "", "".join(chr(c) for c in range(256) if chr(c) not in "0123456789.")
+)
+# Integer or decimal number
+_FLOAT_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+# CSS selectors of the product grid page
+_SEL_GRID = '[class^="ProductGridItem__item__"]'
+_SEL_SHOWMORE = '[class*="ShowMoreButton__button__"]'
+_SEL_TITLE = '[class^="Title__title__"]'
+_SEL_IMG = '[class^="ProductGridItem__image__"]'
+_SEL_BUY = '[class*="ProductGridItem__buyPrice__"]'
+_SEL_STRIKE = '[class*="StrikeThroughPrice__strikePrice__"]'
+_SEL_COUPON = '[class*="Price__base__"]'
+_SEL_ICON = '[class^="Icon__icon__"]'
+_SEL_REVIEWS = '[class^="ProductGridItem__reviewCount"]'
+
+# The raw fields read off each product grid item, given as
+# field name: (CSS selector within the product, attribute name or None for its text)
+_PRODUCT_FIELDS = {
+    "link": (_SEL_TITLE, "href"),
+    "title": (_SEL_TITLE, None),
+    "image_alt": (f"{_SEL_IMG} img", "alt"),
+    "buy_price": (_SEL_BUY, "aria-label"),
+    "original_price": (_SEL_STRIKE, "aria-label"),
+    "coupon_value": (_SEL_COUPON, "aria-label"),
+    "rating": (_SEL_ICON, "innerHTML"),
+    "review_count": (_SEL_REVIEWS, None),
+}
+
+# Clicks the show more button until it is gone or max pages are loaded, waiting for each new
+# page of products to render, and returns the number of clicks via the Selenium callback.
+_PAGINATE_JS = """
+const [buttonSelector, itemSelector, maxPages, timeoutMs, done] = arguments;
+const waitFor = (predicate) => new Promise((resolve) => {
+    if (predicate()) {
+        resolve(true);
+        return;
+    }
+    const observer = new MutationObserver(() => {
+        if (predicate()) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(true);
+        }
+    });
+    const timer = setTimeout(() => {
+        observer.disconnect();
+        resolve(false);
+    }, timeoutMs);
+    observer.observe(document.body, {childList: true, subtree: true});
+});
+(async () => {
+    let pages = 0;
+    while (pages < maxPages) {
+        if (!(await waitFor(() => document.querySelector(buttonSelector) !== null))) {
+            break;
+        }
+        const count = document.querySelectorAll(itemSelector).length;
+        document.querySelector(buttonSelector).click();
+        pages += 1;
+        await waitFor(() => document.querySelectorAll(itemSelector).length > count);
+    }
+    return pages;
+})().then(done);
+"""
+
+
+def _parse_price(price: str | None, name: str) -> float | None:
+    """Parses the price from its aria label, e.g. "$1,299.99".
+
+    Args:
+        price: The aria label of the price web element.
+        name: The name of price used for logging.
+
+    Returns:
+        price: The price as float.
+    """
+    if price is None:
+        logger.warning("Cannot find the web element for %s, assuming null..", name)
+        return None
+    try:
+        # Remove non-numeric characters and convert to float
+        return float(price.translate(_PRICE_TBL))
+    except ValueError:
+        pass
+    try:
+        # NOTE the table only covers latin-1, strip any other non-numeric characters too
+        return float(_NUM_STRIP_RE.sub("", price))
+    except ValueError:
+        # Handle the case where the string cannot be converted
+        logger.warning("Cannot convert %s '%s' to float, assuming null..", name, price)
+        return None
 
 
 class Amazon(BaseRetailer):
@@ -28,6 +118,8 @@ class Amazon(BaseRetailer):
     """
 
     retailer = Retailer.AMZ
+    product_selector = _SEL_GRID
+    product_fields = _PRODUCT_FIELDS
 
     def paginate_and_scrape(self, url: str):
         """This method clicks on Show more button to load additional pages of data into the same
@@ -37,281 +129,166 @@ class Amazon(BaseRetailer):
             url: The input https URL in string format.
         """
         super().scrape_page(url)
-        # Press show more button until all items are rendered in the page.
-        for page_num in range(self.max_pagination):
-            try:
-                # Wait for the element to be present
-                show_more_button: WebElement = WebDriverWait(
-                    self.driver, self.timeout
-                ).until(
-                    EC.presence_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            '[class*="{}"]'.format("ShowMoreButton__button__"),
-                        )
-                    )
-                )
-                show_more_button.click()
-                logger.info(
-                    "Clicked on show more button to get page %d..", page_num + 1
-                )
-            except TimeoutException:
-                logger.warning(
-                    "Did not find the show more element after waiting %d seconds. Moving on..",
-                    self.timeout,
-                )
-                break
-            except NoSuchElementException:
-                logger.info("Show more element is not present. Moving on..")
-                break
-        # find all product elements in the page
-        elements = self.get_product_elements()
-        self.parse_products_information(elements)
-
-    def get_product_elements(self) -> List[WebElement]:
-        """Parses the list of products of retailer web page.
-
-        Returns:
-            elements: List of products as web elements.
-        """
-        return self.driver.find_elements(
-            by=By.CSS_SELECTOR, value='[class^="{}"]'.format("ProductGridItem__item__")
-        )
+        # Press show more button until all items are rendered in the page. The loop runs in the
+        # browser so pages do not cost WebDriver polling round trips.
+        # NOTE each page waits up to timeout for the button and again for new products
+        self.driver.set_script_timeout(self.timeout * (2 * self.max_pagination + 1))
+        try:
+            num_pages = self.driver.execute_async_script(
+                _PAGINATE_JS,
+                _SEL_SHOWMORE,
+                _SEL_GRID,
+                self.max_pagination,
+                self.timeout * 1000,
+            )
+            logger.info("Clicked on show more button to get %d more pages..", num_pages)
+        except TimeoutException:
+            logger.warning(
+                "Pagination did not finish within the script timeout. Moving on.."
+            )
+        except WebDriverException as e:
+            logger.warning("Failed to paginate via script, error: %s. Moving on..", e)
+        finally:
+            # NOTE the following scripts run with the scraper timeout again
+            self.driver.set_script_timeout(self.timeout)
+        # extract fields of all product elements in the page
+        self.parse_products_information(self.get_products())
 
     @staticmethod
-    def get_product_id(element: WebElement) -> str | None:
+    def get_product_id(product: dict) -> str | None:
         """Extract unique identifier of product given by the retailer. Usually part of product
         url.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             product_id: The product identifier
         """
-        try:
-            title = element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("Title__title__")
-            )
-            # extract unique identifier of product page on amazon
-            # Regular expression to match the pattern /dp/ followed by the product ID
-            match = re.search(r"/dp/([^/?]+)", title.get_attribute("href"))
-            if match:
-                return match.group(1)
-            else:
-                return None
-        except NoSuchElementException as e:
-            logger.error(
-                "Something failed to create row entries from the production information, "
-                "error: %s",
-                e,
-                exc_info=True,
-            )
+        link = product.get("link")
+        if not link:
+            logger.error("Cannot find the product link, skipping product..")
+            return None
+        # extract unique identifier of product page on amazon
+        match = _DP_RE.search(link)
+        if match:
+            return match.group(1)
+        else:
             return None
 
     @staticmethod
-    def get_product_buy_price(element: WebElement) -> float | None:
+    def get_product_buy_price(product: dict) -> float | None:
         """Extract the current buy price of product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             price: The current buy price.
         """
-        try:
-            class_name = "ProductGridItem__buyPrice__"
-            price = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class*="{}"]'.format(class_name),
-            ).get_attribute("aria-label")
-            try:
-                # Remove non-numeric characters and convert to float
-                return float(re.sub(r"[^\d.]", "", price))
-            except ValueError:
-                # Handle the case where the string cannot be converted
-                logger.warning(
-                    "Cannot convert buy price '%s' to float, assuming null..", price
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning(
-                "Cannot find the web element for buy price %s, assuming null..",
-                class_name,
-            )
-            return None
+        return _parse_price(product.get("buy_price"), "buy price")
 
     @staticmethod
-    def get_product_original_price(element: WebElement) -> float | None:
+    def get_product_original_price(product: dict) -> float | None:
         """Extract the original price of product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             price: The product original price.
         """
-        try:
-            class_name = "StrikeThroughPrice__strikePrice__"
-            price = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class*="{}"]'.format(class_name),
-            ).get_attribute("aria-label")
-            try:
-                # Remove non-numeric characters and convert to float
-                return float(re.sub(r"[^\d.]", "", price))
-            except ValueError:
-                # Handle the case where the string cannot be converted
-                logger.warning(
-                    "Cannot convert original price '%s' to float, assuming null..",
-                    price,
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning(
-                "Cannot find the web element for original price %s, assuming null..",
-                class_name,
-            )
-            return None
+        return _parse_price(product.get("original_price"), "original price")
 
     @staticmethod
-    def get_product_coupon_value(element: WebElement) -> float | None:
+    def get_product_coupon_value(product: dict) -> float | None:
         """Extract the coupon value website offers for the product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             price: The coupon value.
         """
-        try:
-            class_name = "Price__base__"
-            price = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class*="{}"]'.format(class_name),
-            ).get_attribute("aria-label")
-            try:
-                # Remove non-numeric characters and convert to float
-                return float(re.sub(r"[^\d.]", "", price))
-            except ValueError:
-                # Handle the case where the string cannot be converted
-                logger.warning(
-                    "Cannot convert coupon value '%s' to float, assuming null..", price
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning(
-                "Cannot find the web element for coupon value %s, assuming null..",
-                class_name,
-            )
-            return None
+        return _parse_price(product.get("coupon_value"), "coupon value")
 
     @staticmethod
-    def get_product_title(element: WebElement) -> str | None:
+    def get_product_title(product: dict) -> str | None:
         """Extract the product title given by the retailer.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             title: The title of product.
         """
-        try:
-            title = element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("Title__title__")
-            )
-            # get image element
-            image = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format("ProductGridItem__image__"),
-            )
-            # get product name
-            try:
-                # NOTE currently image alt shows more complete name of product
-                return image.find_element(by=By.TAG_NAME, value="img").get_attribute(
-                    "alt"
-                )
-            except NoSuchElementException:
-                # if element does not exist use title span text as backup option
-                return title.text
-        except NoSuchElementException as e:
-            logger.exception(
-                "Something failed to create row entries from the production information, "
-                "error: %s",
-                e,
-            )
+        if product.get("title") is None:
+            logger.error("Cannot find the product title, assuming null..")
             return None
+        # NOTE currently image alt shows more complete name of product,
+        # if it does not exist use title span text as backup option
+        return product.get("image_alt") or product["title"]
 
     @staticmethod
-    def get_product_rating(element: WebElement) -> float | None:
+    def get_product_rating(product: dict) -> float | None:
         """Extract the product rating on the retailer website.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             rating: The product rating out of scale of 5.
         """
-        try:
-            rating = element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("Icon__icon__")
-            ).get_attribute("innerHTML")
-            try:
-                # Extract the numeric part of the rating (handles both integer and decimal)
-                match = re.search(r"(\d+(\.\d+)?)", rating)
-                if match:
-                    return float(match.group(1))
-                else:
-                    # If the format doesn't match, return None
-                    logger.warning(
-                        "Cannot match rating from '%s', assuming null..", rating
-                    )
-                    return None
-            except ValueError:
-                # Handle any unexpected ValueError
-                logger.warning(
-                    "Cannot extract rating from '%s', assuming null..", rating
-                )
-                return None
-        except NoSuchElementException:
+        rating = product.get("rating")
+        if rating is None:
             logger.warning("Cannot find the web element for rating, assuming null..")
             return None
+        # Fast path for rating text starting with the number, e.g. "4.5 out of 5 stars"
+        try:
+            return float(rating.split(maxsplit=1)[0])
+        except (ValueError, IndexError):
+            pass
+        # Extract the numeric part of the rating (handles both integer and decimal)
+        match = _FLOAT_RE.search(rating)
+        if match:
+            return float(match.group(1))
+        else:
+            # If the format doesn't match, return None
+            logger.warning("Cannot match rating from '%s', assuming null..", rating)
+            return None
 
     @staticmethod
-    def get_product_review_count(element: WebElement) -> int | None:
+    def get_product_review_count(product: dict) -> int | None:
         """Extract the number of reviews of the product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             review_count: The number of reviews of the product in the retailer website.
         """
+        review_count = product.get("review_count")
+        if review_count is None:
+            logger.warning(
+                "Cannot find the web element for review count, assuming null.."
+            )
+            return None
+        # Remove thousands separator, e.g. "1,234"
+        review_count = review_count.replace(",", "")
+        # Fast path for review count text starting with the number
         try:
-            review_count = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format("ProductGridItem__reviewCount"),
-            ).text
-            try:
-                # Extract the numerical part
-                match = re.search(r"(\d+(?:\.\d+)?)", review_count)
-                if match:
-                    # Convert to float and then to int to get the integer part
-                    return int(float(match.group(1)))
-                else:
-                    # If no valid number is found, return None
-                    logger.warning(
-                        "Cannot match review count from '%s', assuming null..",
-                        review_count,
-                    )
-                    return None
-            except ValueError:
-                # If conversion fails, return None
-                logger.warning(
-                    "Cannot extract review count from '%s', assuming null..",
-                    review_count,
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning("Cannot find the web element for rating, assuming null..")
+            return int(review_count.split(maxsplit=1)[0])
+        except (ValueError, IndexError):
+            pass
+        # Extract the numerical part
+        match = _FLOAT_RE.search(review_count)
+        if match:
+            # Convert to float and then to int to get the integer part
+            return int(float(match.group(1)))
+        else:
+            # If no valid number is found, return None
+            logger.warning(
+                "Cannot match review count from '%s', assuming null..",
+                review_count,
+            )
             return None
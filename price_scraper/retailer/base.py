@@ -1,22 +1,95 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 import logging
 import os
-from typing import List, TYPE_CHECKING
+import threading
+from typing import Callable, Dict, List, Tuple, TYPE_CHECKING, TypeVar
+import uuid
 
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.proxy import Proxy
 from selenium.webdriver.firefox.options import Options
 
 from price_scraper.enums import Retailer
-from price_scraper.models import ProductPrice, ProductMetadata
+from price_scraper.models import ProductMetadataBatch, ProductPriceBatch
+from price_scraper.retailer._locators import locator
+
+try:
+    from price_scraper.retailer.html_parser import extract_products
+except ImportError:
+    # NOTE selectolax is an optional dependency, products are extracted in the browser without it
+    extract_products = None  # type: ignore[assignment]
+
+try:
+    from price_scraper.retailer.http_fast import fetch_pages
+except ImportError:
+    # NOTE httpx is an optional dependency, pages are only loaded in the browser without it
+    fetch_pages = None  # type: ignore[assignment]
 
 if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
     from selenium.webdriver.remote.webelement import WebElement
 
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Idle web drivers kept warm for later scrapes in the process, keyed by proxy configuration
+_DRIVER_POOL: Dict[frozenset, List[WebDriver]] = {}
+_DRIVER_POOL_LOCK = threading.Lock()
+
+
+def _get_pool_key(proxy_kwargs: dict | None) -> frozenset:
+    """Gets the driver pool key of the proxy configuration the drivers are created with.
+
+    Args:
+        proxy_kwargs: Selenium Firefox proxy configuration.
+    """
+    return frozenset((key, str(value)) for key, value in (proxy_kwargs or {}).items())
+
+
+def _quit_driver(driver: WebDriver):
+    """Quits the web driver, ignoring drivers whose browser is already gone."""
+    try:
+        driver.quit()
+    except WebDriverException as e:
+        logger.warning("Failed to quit web driver, error: %s", e)
+
+
+@atexit.register
+def _shutdown_driver_pool():
+    """Quits the idle pooled web drivers on interpreter exit."""
+    with _DRIVER_POOL_LOCK:
+        drivers = [driver for idle in _DRIVER_POOL.values() for driver in idle]
+        _DRIVER_POOL.clear()
+    for driver in drivers:
+        _quit_driver(driver)
+
+
+# Reads the fields of all products in the browser and returns them in one round trip.
+# NOTE properties are read before attributes to match Selenium get_attribute, e.g. absolute href
+_EXTRACT_JS = """
+const [productSelector, fields] = arguments;
+return Array.from(document.querySelectorAll(productSelector), (item) => {
+    const product = {};
+    for (const [key, [selector, attribute]] of Object.entries(fields)) {
+        const node = item.querySelector(selector);
+        if (node === null) {
+            product[key] = null;
+        } else if (attribute === null) {
+            product[key] = node.innerText;
+        } else {
+            product[key] = node[attribute] ?? node.getAttribute(attribute);
+        }
+    }
+    return product;
+});
+"""
 
 
 class BaseRetailer(ABC):
@@ -27,13 +100,26 @@ class BaseRetailer(ABC):
         brand: The brand of products being scraped.
         category: The drill down category of products being scraped as a list of string.
         timeout: Web page scraping timeout in seconds.
+        max_pagination: The maximum number of pages to scrape.
+        proxy_kwargs: Selenium Firefox proxy configuration.
+        max_workers: The maximum number of web drivers loading pages concurrently.
+        fast_path: Whether to fetch server rendered pages over plain HTTP instead of the web
+            browser, for retailers supporting it. Requires httpx and selectolax.
 
     Attributes:
-        products: The list of product prices scraped from the retailer.
-        product_metadata: The list of product metadata scraped from the retailer.
+        retailer: The enum specified for the retailer.
+        product_selector: The CSS selector of product elements in the retailer page.
+        product_fields: The raw fields read off each product element, given as
+            field name: (CSS selector within the product, attribute name or None for its text).
+        extract_js: The script extracting product_fields of all products in the browser.
+        product_prices: The product price rows scraped from the retailer.
+        product_metadata: The product metadata rows scraped from the retailer.
     """
 
     retailer: Retailer = Retailer.BASE
+    product_selector: str = ""
+    product_fields: Dict[str, Tuple[str, str | None]] = {}
+    extract_js: str = _EXTRACT_JS
 
     def __init__(
         self,
@@ -42,118 +128,311 @@ class BaseRetailer(ABC):
         timeout: int = 10,
         max_pagination: int = 20,
         proxy_kwargs: dict | None = None,
+        max_workers: int = 4,
+        fast_path: bool = False,
     ):
         self.timeout = timeout
         self.brand = brand
         self.category = category
         self.max_pagination = max_pagination
-        self.product_prices: List[ProductPrice] = []
-        self.product_metadata: List[ProductMetadata] = []
+        self.max_workers = max_workers
+        self.proxy_kwargs = proxy_kwargs
+        self.fast_path = fast_path
+        if fast_path and (fetch_pages is None or extract_products is None):
+            logger.warning(
+                "Fast path requires httpx and selectolax to be installed, "
+                "pages are loaded in the web browser instead."
+            )
+            self.fast_path = False
+        self.product_prices = ProductPriceBatch()
+        self.product_metadata = ProductMetadataBatch()
 
-        logger.critical("Creating web browser driver..")
         if proxy_kwargs:
-            webdriver.DesiredCapabilities.FIREFOX["proxy"] = proxy_kwargs
             logger.info("Configured proxy with following setting: %s", proxy_kwargs)
+        self._driver: WebDriver | None = None
+
+    @property
+    def driver(self) -> WebDriver:
+        """The web driver, created on first access so pages served over HTTP skip the browser."""
+        if self._driver is None:
+            self._driver = self.acquire_driver()
+        return self._driver
+
+    def acquire_driver(self) -> WebDriver:
+        """Takes an idle web driver with the same proxy configuration from the process pool,
+        so repeated scrapes in a process skip the browser start up, or creates a new one.
+
+        Returns:
+            driver: The web driver, set with the scraper page load and script timeouts.
+        """
+        key = _get_pool_key(self.proxy_kwargs)
+        while True:
+            with _DRIVER_POOL_LOCK:
+                idle = _DRIVER_POOL.get(key)
+                driver = idle.pop() if idle else None
+            if driver is None:
+                return self.create_driver()
+            try:
+                # NOTE setting the timeouts also checks the pooled browser is still alive
+                driver.set_page_load_timeout(self.timeout)
+                driver.set_script_timeout(self.timeout)
+                return driver
+            except WebDriverException:
+                logger.warning("Discarding unresponsive pooled web driver..")
+                _quit_driver(driver)
+
+    def release_driver(self, driver: WebDriver):
+        """Returns the web driver to the process pool for later scrapes instead of quitting it.
+        Pooled drivers are quit on interpreter exit.
+
+        Args:
+            driver: The web driver taken by acquire_driver.
+        """
+        with _DRIVER_POOL_LOCK:
+            _DRIVER_POOL.setdefault(_get_pool_key(self.proxy_kwargs), []).append(driver)
+
+    def create_driver(self) -> WebDriver:
+        """Creates a headless Firefox web driver with the scraper proxy, page load and script
+        timeouts.
+
+        Returns:
+            driver: The web driver.
+        """
+        logger.critical("Creating web browser driver..")
         firefox_options = Options()
         firefox_options.add_argument("--headless")
-        firefox_options.set_preference("browser.cache.disk.enable", False)
-        firefox_options.set_preference("browser.cache.memory.enable", False)
-        firefox_options.set_preference("browser.cache.offline.enable", False)
-        firefox_options.set_preference("network.http.use-cache", False)
-        self.driver = webdriver.Firefox(
-            service_log_path=os.devnull, options=firefox_options
+        # NOTE the browser cache is kept, static resources are reused across retailer pages
+        # turn off background telemetry, updates and safe browsing lookups
+        firefox_options.set_preference("toolkit.telemetry.enabled", False)
+        firefox_options.set_preference(
+            "datareporting.healthreport.uploadEnabled", False
         )
-        self.driver.set_page_load_timeout(timeout)
+        firefox_options.set_preference("app.update.auto", False)
+        firefox_options.set_preference("extensions.update.enabled", False)
+        firefox_options.set_preference("browser.safebrowsing.malware.enabled", False)
+        firefox_options.set_preference("browser.safebrowsing.phishing.enabled", False)
+        firefox_options.set_preference("dom.webnotifications.enabled", False)
+        # NOTE prices are read off the page text, skip downloading what only renders the page
+        firefox_options.set_preference("permissions.default.image", 2)
+        firefox_options.set_preference("browser.display.use_document_fonts", 0)
+        firefox_options.set_preference("media.autoplay.default", 5)
+        # return from page loads on DOMContentLoaded, retailers wait for their own elements
+        firefox_options.page_load_strategy = "eager"
+        if self.proxy_kwargs:
+            firefox_options.proxy = Proxy(self.proxy_kwargs)
+        driver = webdriver.Firefox(service_log_path=os.devnull, options=firefox_options)
+        driver.set_page_load_timeout(self.timeout)
+        driver.set_script_timeout(self.timeout)
         logger.info(
-            "Web browser driver created with timeout set to %d seconds.", timeout
+            "Web browser driver created with timeout set to %d seconds.", self.timeout
         )
+        return driver
 
     def close(self):
-        """Closes scrapping session."""
-        self.driver.quit()
+        """Closes scrapping session, the web driver is returned to the pool for reuse."""
+        if self._driver is not None:
+            self.release_driver(self._driver)
+            self._driver = None
 
     @staticmethod
-    def get_product_additional_attributes(element: WebElement) -> dict | None:
+    def get_product_additional_attributes(product: dict) -> dict | None:
         """Gets product additional attributes that may exist in the retailer page.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
     @staticmethod
-    def get_product_buy_price(element: WebElement) -> float | None:
+    def get_product_buy_price(product: dict) -> float | None:
         """Gets product buying price.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
     @staticmethod
-    def get_product_coupon_value(element: WebElement) -> float | None:
+    def get_product_coupon_value(product: dict) -> float | None:
         """Gets product coupon value if any.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
-    @abstractmethod
-    def get_product_elements(self) -> List[WebElement]:
+    def get_product_elements(self, driver: WebDriver | None = None) -> List[WebElement]:
         """Parses the list of products of retailer web page.
 
+        Args:
+            driver: The web driver of the page, defaults to the scraper driver.
+
         Returns:
             elements: List of products as web elements.
         """
-        raise NotImplementedError
+        driver = driver or self.driver
+        return driver.find_elements(*locator(self.product_selector))
+
+    def get_products(self, driver: WebDriver | None = None) -> List[dict]:
+        """Extracts the raw fields of all products in the page with a single round trip,
+        instead of a WebDriver round trip per field of each product.
+
+        If selectolax is installed the page source is parsed in Python, otherwise the fields are
+        read by extract_js in the browser. Falls back to per element lookups if either fails.
+
+        Args:
+            driver: The web driver of the page, defaults to the scraper driver.
+
+        Returns:
+            products: List of raw product fields.
+        """
+        driver = driver or self.driver
+        try:
+            if extract_products is not None:
+                return extract_products(
+                    driver.page_source,
+                    self.product_selector,
+                    self.product_fields,
+                    driver.current_url,
+                )
+            return driver.execute_script(
+                self.extract_js, self.product_selector, self.product_fields
+            )
+        except WebDriverException as e:
+            logger.warning(
+                "Failed to extract products in a single round trip, falling back to per "
+                "element lookups, error: %s",
+                e,
+            )
+            return [
+                self.extract_raw_texts(element)
+                for element in self.get_product_elements(driver)
+            ]
+
+    def extract_raw_texts(self, element: WebElement) -> dict:
+        """Extracts the raw product fields from the product web element. Subclasses may override
+        this hook to read the fields with fewer WebDriver calls.
+
+        If selectolax is installed the product outerHTML is read in a single round trip and parsed
+        in Python, otherwise each field is looked up over WebDriver.
+
+        NOTE each field is read once and shared by the getters, e.g. the BestBuy SKU and model
+        are both parsed off the same sku_model text. Fields sharing a selector, or a selector and
+        attribute, reuse the WebDriver lookups of the first one.
+
+        Args:
+            element: The product web element.
+
+        Returns:
+            product: The raw product fields, a missing field is set to None.
+        """
+        if extract_products is not None:
+            products = extract_products(
+                element.get_attribute("outerHTML"),
+                self.product_selector,
+                self.product_fields,
+                element.parent.current_url,
+            )
+            if products:
+                return products[0]
+        nodes_cache: Dict[str, List[WebElement]] = {}
+        value_cache: Dict[Tuple[str, str | None], str | None] = {}
+        product = {}
+        for key, (selector, attribute) in self.product_fields.items():
+            if (selector, attribute) not in value_cache:
+                if selector not in nodes_cache:
+                    nodes_cache[selector] = element.find_elements(*locator(selector))
+                nodes = nodes_cache[selector]
+                if not nodes:
+                    value = None
+                elif attribute is None:
+                    value = nodes[0].text
+                else:
+                    value = nodes[0].get_attribute(attribute)
+                value_cache[(selector, attribute)] = value
+            product[key] = value_cache[(selector, attribute)]
+        return product
 
     @staticmethod
     @abstractmethod
-    def get_product_id(element: WebElement) -> str | None:
+    def get_product_id(product: dict) -> str | None:
         """Gets product unique identifier.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         raise NotImplementedError
 
     @staticmethod
-    def get_product_original_price(element: WebElement) -> float | None:
+    def get_product_original_price(product: dict) -> float | None:
         """Gets product buying price.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
     @staticmethod
-    def get_product_rating(element: WebElement) -> float | None:
+    def get_product_rating(product: dict) -> float | None:
         """Gets product rating.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
     @staticmethod
-    def get_product_review_count(element: WebElement) -> int | None:
+    def get_product_review_count(product: dict) -> int | None:
         """Gets number of reviews for the product.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
     @staticmethod
-    def get_product_title(element: WebElement) -> str | None:
+    def get_product_title(product: dict) -> str | None:
         """Gets product title name as written by retailer.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
         return None
 
+    def map_pages(
+        self, page_urls: List[str], scrape_fn: Callable[[WebDriver, str], T]
+    ) -> List[T]:
+        """Scrapes the page URLs concurrently, since page loads are network bound. Each worker
+        thread takes its own web driver once and reuses it for the pages it is handed, the
+        worker drivers are returned to the pool once all pages are scraped.
+
+        Args:
+            page_urls: The page URLs to scrape.
+            scrape_fn: The function scraping a page given the worker driver and the page URL.
+
+        Returns:
+            results: The results of scrape_fn in the order of page_urls.
+        """
+        if not page_urls:
+            return []
+        local = threading.local()
+        drivers: List[WebDriver] = []
+
+        def worker(page_url: str) -> T:
+            if not hasattr(local, "driver"):
+                local.driver = self.acquire_driver()
+                drivers.append(local.driver)
+            return scrape_fn(local.driver, page_url)
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(self.max_workers, len(page_urls)))
+            ) as pool:
+                return list(pool.map(worker, page_urls))
+        finally:
+            for driver in drivers:
+                self.release_driver(driver)
+
     def paginate_and_scrape(self, url: str):
         """This method paginates the product pages and scrapes each page for product information.
         If subclass does not provide pagination logic, the base class assumes only a single page.
@@ -165,50 +444,68 @@ class BaseRetailer(ABC):
             url: The input https URL in string format.
         """
         self.scrape_page(url)
-        elements = self.get_product_elements()
-        self.parse_products_information(elements)
+        self.parse_products_information(self.get_products())
+
+    def parse_products_information(self, products: List[dict]):
+        """Goes through the raw fields of each product and parse product information using
+        aux methods, and appends it to the product_prices and product_metadata column batches.
 
-    def parse_products_information(self, elements: List[WebElement]):
-        """Goes through each product element and parse product element information using
-        aux methods, and stores it product_prices and product_metadata attributes.
+        NOTE this makes no WebDriver calls, the raw fields are extracted by get_products.
 
         Args:
-            elements: The list of web element scraped from the page.
+            products: The list of raw product fields extracted from the page.
         """
-        for element in elements:
+        prices = self.product_prices
+        metadata = self.product_metadata
+        # NOTE values shared by all products of the scrape are read once, outside the loop
+        retailer = self.retailer
+        retailer_prefix = retailer.name
+        brand = self.brand
+        category = self.category
+        today = date.today()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for product in products:
             try:
-                product_id = self.get_product_id(element)
+                product_id = self.get_product_id(product)
                 if not product_id:
                     logger.error("Cannot fetch product_id, skipping product..")
                     continue
                 # prepend retailer enum to enforce cross retailer uniqueness
-                product_id = f"{self.retailer.name}{product_id}"
-                meta = ProductMetadata(
-                    product_id=product_id,
-                    retailer=self.retailer,
-                    brand=self.brand,
-                    category=self.category,
-                    title=self.get_product_title(element),
-                    additional_attributes=self.get_product_additional_attributes(
-                        element
-                    ),
-                )
-                price = ProductPrice(
-                    product_id=product_id,
-                    date=date.today(),
-                    buy_price=self.get_product_buy_price(element),
-                    original_price=self.get_product_original_price(element),
-                    coupon_value=self.get_product_coupon_value(element),
-                    rating=self.get_product_rating(element),
-                    review_count=self.get_product_review_count(element),
-                )
-                logger.debug(
-                    "Meta: %s -- Price: %s",
-                    {k: v for k, v in vars(meta).items() if not k.startswith("_")},
-                    {k: v for k, v in vars(price).items() if not k.startswith("_")},
-                )
-                self.product_metadata.append(meta)
-                self.product_prices.append(price)
+                product_id = f"{retailer_prefix}{product_id}"
+                title = self.get_product_title(product)
+                additional_attributes = self.get_product_additional_attributes(product)
+                buy_price = self.get_product_buy_price(product)
+                original_price = self.get_product_original_price(product)
+                coupon_value = self.get_product_coupon_value(product)
+                rating = self.get_product_rating(product)
+                review_count = self.get_product_review_count(product)
+                if debug:
+                    logger.debug(
+                        "Meta: %s, %s, %s -- Price: %s, %s, %s, %s, %s",
+                        product_id,
+                        title,
+                        additional_attributes,
+                        buy_price,
+                        original_price,
+                        coupon_value,
+                        rating,
+                        review_count,
+                    )
+                # NOTE columns are appended once all getters succeed, so rows stay aligned
+                metadata.product_id.append(product_id)
+                metadata.retailer.append(retailer)
+                metadata.brand.append(brand)
+                metadata.category.append(category)
+                metadata.title.append(title)
+                metadata.additional_attributes.append(additional_attributes)
+                prices.id.append(str(uuid.uuid4()))
+                prices.product_id.append(product_id)
+                prices.date.append(today)
+                prices.buy_price.append(buy_price)
+                prices.original_price.append(original_price)
+                prices.coupon_value.append(coupon_value)
+                prices.rating.append(rating)
+                prices.review_count.append(review_count)
                 logger.info("Scraped product id '%s'.", product_id)
             except Exception as e:
                 logger.error(
@@ -218,14 +515,16 @@ class BaseRetailer(ABC):
                     exc_info=True,
                 )
 
-    def scrape_page(self, url: str):
+    def scrape_page(self, url: str, driver: WebDriver | None = None):
         """Scrape given page URL via Selenium.
 
         Args:
             url: The input https URL in string format.
+            driver: The web driver loading the page, defaults to the scraper driver.
         """
+        driver = driver or self.driver
         logger.critical("Parsing '%s'..", url)
         try:
-            self.driver.get(url)
+            driver.get(url)
         except TimeoutException:
-            self.driver.execute_script("window.stop();")
+            driver.execute_script("window.stop();")
@@ -1,22 +1,162 @@
 from __future__ import annotations
 
+from functools import lru_cache
 import logging
 import re
-from typing import List, TYPE_CHECKING
+from typing import Dict, List, Tuple, TYPE_CHECKING
 
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from price_scraper.enums import Retailer
 from price_scraper.retailer.base import BaseRetailer
 
+try:
+    from price_scraper.retailer.http_fast import fetch_pages
+except ImportError:
+    # NOTE httpx is an optional dependency, BaseRetailer turns off fast_path without it
+    fetch_pages = None  # type: ignore[assignment]
+
 if TYPE_CHECKING:
-    from selenium.webdriver.remote.webelement import WebElement
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+logger = logging.getLogger(__name__)
+
+# Regular expression to match various price formats
+_PRICE_RE = re.compile(r"\$\d{1,3}(?:,\d{3})*(?:\.\d{0,2})?")
+# SKU or model, both are read off the same description in a single scan
+# NOTE the model ends at the line end or the SKU that follows it, as parsed page text
+# collapses the line break between them
+_SKU_MODEL_RE = re.compile(r"SKU:\s*(\S+)|Model:\s*(.+?)(?=\s+SKU:|\n|$)")
+# Rating or review count, both are read off the same reviews text in a single scan
+# NOTE the review count starts with a digit, so the commas alone are not parsed as a count
+_REVIEWS_RE = re.compile(r"Rating (\d+(?:\.\d+)?) out of|with (\d[\d,]*) reviews")
+
+# CSS selectors of the product list page elements
+_SEL_LIST = '[class^="list-item"]'
+_SEL_SKU = '[class^="sku-model"]'
+_SEL_TITLE = '[class^="sku-title"]'
+_SEL_PRICE = '[class^="priceView-hero-price"]'
+_SEL_ORIG = '[class^="pricing-price__regular-price-content"]'
+_SEL_REVIEWS = '[class^="c-ratings-reviews"]'
+_SEL_PAGING = '[class^="paging-list"]'
+_SEL_PAGE_ITEM = '[class^="page-item"]'
+
+# Reads the text of the last page item of the pagination section in a single round trip,
+# or null if there is no pagination section
+_LAST_PAGE_JS = """
+const [pagingSelector, itemSelector] = arguments;
+const items = document.querySelector(pagingSelector)?.querySelectorAll(itemSelector) ?? [];
+return items.length ? items[items.length - 1].innerText : null;
+"""
+
+# Waits in the browser until the document is parsed and a product is rendered, or the timeout
+# passes, and returns whether products are found via the Selenium callback.
+_WAIT_FOR_PRODUCTS_JS = """
+const [itemSelector, timeoutMs, done] = arguments;
+const isReady = () => (
+    document.readyState !== "loading" && document.querySelector(itemSelector) !== null
+);
+if (isReady()) {
+    done(true);
+    return;
+}
+const finish = (found) => {
+    observer.disconnect();
+    document.removeEventListener("readystatechange", check);
+    clearTimeout(timer);
+    done(found);
+};
+const check = () => {
+    if (isReady()) {
+        finish(true);
+    }
+};
+const observer = new MutationObserver(check);
+observer.observe(document, {childList: true, subtree: true});
+document.addEventListener("readystatechange", check);
+const timer = setTimeout(() => finish(false), timeoutMs);
+"""
+
+# The raw fields read off each product list item, given as
+# field name: (CSS selector within the product, attribute name or None for its text)
+_PRODUCT_FIELDS: Dict[str, Tuple[str, str | None]] = {
+    "sku_model": (_SEL_SKU, None),
+    "title": (_SEL_TITLE, None),
+    "buy_price": (_SEL_PRICE, None),
+    "original_price": (_SEL_ORIG, None),
+    "reviews": (_SEL_REVIEWS, None),
+}
+
+
+def _parse_price(price: str | None, class_name: str) -> float | None:
+    """Parses the price from the price text, e.g. "$1,299.99".
+
+    Args:
+        price: The text of the price web element.
+        class_name: The class name of the price web element used for logging.
+
+    Returns:
+        price: The price as float.
+    """
+    if price is None:
+        logger.warning("%s element not found, skipping item..", class_name)
+        return None
+    match = _PRICE_RE.search(price)
+    if match:
+        # Removing commas and dollar sign, and converting to float
+        return float(match.group(0).replace(",", "").replace("$", ""))
+    else:
+        # If no price is found, return None
+        logger.error(
+            "%s information could not be extracted from %s, skipping item..",
+            class_name,
+            price,
+        )
+        return None
 
 
-logger = logging.getLogger()
+@lru_cache(maxsize=128)
+def _parse_sku_model(description: str) -> Tuple[str | None, str | None]:
+    """Parses the SKU and the model from the description text, e.g.
+    "Model: MQKP3LL/A SKU: 6509650". The result is cached, since the product id and additional
+    attributes getters parse the same text one after the other.
+
+    Args:
+        description: The text of the sku-model web element.
+
+    Returns:
+        sku: The product SKU.
+        model: The product model.
+    """
+    sku = model = None
+    for match in _SKU_MODEL_RE.finditer(description):
+        if match.group(1) is not None:
+            sku = match.group(1)
+        else:
+            model = match.group(2)
+    return sku, model
+
+
+@lru_cache(maxsize=128)
+def _parse_reviews(reviews: str) -> Tuple[float | None, int | None]:
+    """Parses the rating and the review count from the reviews text, e.g.
+    "Rating 4.8 out of 5 stars with 1,234 reviews". The result is cached, since the rating and
+    review count getters parse the same text one after the other.
+
+    Args:
+        reviews: The text of the reviews web element.
+
+    Returns:
+        rating: The rating out of scale of 5.
+        review_count: The number of reviews.
+    """
+    rating = review_count = None
+    for match in _REVIEWS_RE.finditer(reviews):
+        if match.group(1) is not None:
+            rating = float(match.group(1))
+        else:
+            review_count = int(match.group(2).replace(",", ""))
+    return rating, review_count
 
 
 class BestBuy(BaseRetailer):
@@ -27,31 +167,28 @@ class BestBuy(BaseRetailer):
     """
 
     retailer = Retailer.BBY
+    product_selector = _SEL_LIST
+    product_fields = _PRODUCT_FIELDS
 
     def paginate_and_scrape(self, url: str):
-        """This method clicks on Show more button to load additional pages of data into the same
-        page as part of pagination strategy.
+        """This method reads the number of pages off the pagination section of the first page,
+        and scrapes the remaining pages concurrently via their page number URLs.
+
+        If fast_path is set the pages are fetched over plain HTTP first, since BestBuy product
+        lists are server rendered, and the web browser is only used for the pages that fail.
 
         Args:
             url: The input https URL in string format.
         """
+        if self.fast_path and self._fast_paginate_and_scrape(url):
+            return
         super().scrape_page(url)
-        WebDriverWait(self.driver, self.timeout).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, '[class^="{}"]'.format("footer"))
-            )
-        )
+        self._wait_for_products(self.driver)
         try:
             num_pages = int(
-                self.driver.find_element(
-                    by=By.CSS_SELECTOR, value='[class^="{}"]'.format("paging-list")
-                )
-                .find_elements(
-                    by=By.CSS_SELECTOR, value='[class^="{}"]'.format("page-item")
-                )[-1]
-                .text
+                self.driver.execute_script(_LAST_PAGE_JS, _SEL_PAGING, _SEL_PAGE_ITEM)
             )
-        except (NoSuchElementException, ValueError):
+        except (TypeError, ValueError):
             logger.warning(
                 "Could not extract the pagination section, assuming one page for product.."
             )
@@ -62,266 +199,247 @@ class BestBuy(BaseRetailer):
             num_pages,
             loop_break_counter,
         )
-        page_num = 1
-        while True:
-            elements = self.get_product_elements()
-            self.parse_products_information(elements)
-            page_num += 1
-            if page_num >= loop_break_counter:
-                break
-            try:
-                WebDriverWait(self.driver, self.timeout).until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, '[class^="{}"]'.format("footer"))
-                    )
-                )
-            except (TimeoutException, NoSuchElementException) as e:
-                logger.error(
-                    "Did not find the footer element %s. Moving on..",
-                    e,
-                    exc_info=True,
-                )
-            logger.info("Now scraping page %d out of %d..", page_num, num_pages)
-            super().scrape_page(f"{url}?cp={page_num}")
+        self.parse_products_information(self.get_products())
+        # NOTE the first page is already loaded, the rest are loaded concurrently
+        page_urls = [
+            f"{url}?cp={page_num}" for page_num in range(2, loop_break_counter + 1)
+        ]
+        for products in self.map_pages(page_urls, self._scrape_products):
+            self.parse_products_information(products)
+
+    def _fast_paginate_and_scrape(self, url: str) -> bool:
+        """Fetches and scrapes the pages over plain HTTP, falling back to the web browser for the
+        pages that fail to fetch or have no products.
 
-    def get_product_elements(self) -> List[WebElement]:
-        """Parses the list of products of retailer web page.
+        Args:
+            url: The input https URL in string format.
 
         Returns:
-            elements: List of products as web elements.
+            scraped: Whether the first page was scraped, otherwise nothing is scraped.
         """
-        return self.driver.find_elements(
-            by=By.CSS_SELECTOR, value='[class^="{}"]'.format("list-item")
+        # NOTE fast_path is only enabled when selectolax, and so html_parser, is installed
+        from price_scraper.retailer.html_parser import (
+            extract_products,
+            parse_html,
+            select_texts,
+        )
+
+        html = fetch_pages([url], self.timeout, self.proxy_kwargs)[0]
+        tree = parse_html(html) if html else None
+        products = (
+            []
+            if tree is None
+            else extract_products(tree, self.product_selector, self.product_fields, url)
         )
+        if tree is None or not products:
+            logger.warning(
+                "No products found in '%s' over HTTP, loading it in the web browser..",
+                url,
+            )
+            return False
+        page_items = select_texts(tree, f"{_SEL_PAGING} {_SEL_PAGE_ITEM}")
+        try:
+            num_pages = int(page_items[-1])
+        except (IndexError, ValueError):
+            logger.warning(
+                "Could not extract the pagination section, assuming one page for product.."
+            )
+            num_pages = 1
+        loop_break_counter = min(num_pages, self.max_pagination)
+        logger.info(
+            "Found %d pages to scrape over HTTP, scraping up to %d pages..",
+            num_pages,
+            loop_break_counter,
+        )
+        self.parse_products_information(products)
+        page_urls = [
+            f"{url}?cp={page_num}" for page_num in range(2, loop_break_counter + 1)
+        ]
+        fallback_urls = []
+        for page_url, html in zip(
+            page_urls, fetch_pages(page_urls, self.timeout, self.proxy_kwargs)
+        ):
+            products = (
+                extract_products(
+                    html, self.product_selector, self.product_fields, page_url
+                )
+                if html
+                else []
+            )
+            if products:
+                self.parse_products_information(products)
+            else:
+                fallback_urls.append(page_url)
+        # NOTE web drivers are only created if some pages could not be scraped over HTTP
+        for products in self.map_pages(fallback_urls, self._scrape_products):
+            self.parse_products_information(products)
+        return True
+
+    def _wait_for_products(self, driver: WebDriver):
+        """Waits for the page document to be parsed and the product list to render. The wait
+        runs in the browser, so it costs a single WebDriver round trip instead of polling.
+
+        NOTE the document is not required to be complete, e.g. loads stopped on page timeout.
+
+        Args:
+            driver: The web driver of the page.
+
+        Raises:
+            TimeoutException: If no product is rendered within the timeout.
+        """
+        if not driver.execute_async_script(
+            _WAIT_FOR_PRODUCTS_JS, _SEL_LIST, self.timeout * 1000
+        ):
+            raise TimeoutException("No product rendered within the timeout.")
+
+    def _scrape_products(self, driver: WebDriver, page_url: str) -> List[dict]:
+        """Loads the product list page and extracts its raw product fields.
+
+        Args:
+            driver: The web driver loading the page.
+            page_url: The product list page URL.
+
+        Returns:
+            products: List of raw product fields, empty if the page failed to load.
+        """
+        try:
+            super().scrape_page(page_url, driver=driver)
+            try:
+                self._wait_for_products(driver)
+            except TimeoutException as e:
+                logger.error(
+                    "Did not find the product elements %s. Moving on..",
+                    e,
+                    exc_info=True,
+                )
+            return self.get_products(driver)
+        except WebDriverException as e:
+            logger.error(
+                "Failed to scrape page '%s', skipping page: %s",
+                page_url,
+                e,
+                exc_info=True,
+            )
+            return []
 
     @staticmethod
-    def get_product_id(element: WebElement) -> str | None:
+    def get_product_id(product: dict) -> str | None:
         """Extract unique identifier of product given by the retailer. Usually part of product
         url.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             product_id: The product identifier
         """
         # get model and sku of the product
-        try:
-            description = element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("sku-model")
-            ).text
-            # Regular expression pattern
-            pattern = r"SKU:\s*(\S+)(?:\nModel:\s*(\S+))?"
-            # Search for matches
-            match = re.search(pattern, description)
-            if match:
-                # Extracting SKU as the product id
-                sku = match.group(1)
-                return sku
-            else:
-                logger.exception(
-                    "SKU could not be parsed from description %s, skipping item..",
-                    description,
-                )
-                return None
-        except (NoSuchElementException, ValueError):
-            logger.exception("SKU element not found, skipping item..")
+        description = product.get("sku_model")
+        if description is None:
+            logger.error("SKU element not found, skipping item..")
+            return None
+        # Extracting SKU as the product id
+        sku, _ = _parse_sku_model(description)
+        if sku:
+            return sku
+        else:
+            logger.error(
+                "SKU could not be parsed from description %s, skipping item..",
+                description,
+            )
             return None
 
     @staticmethod
-    def get_product_buy_price(element: WebElement) -> float | None:
+    def get_product_buy_price(product: dict) -> float | None:
         """Extract the current buy price of product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             price: The current buy price.
         """
-        try:
-            class_name = "priceView-hero-price"
-            price = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format(class_name),
-            ).text
-            try:
-                # Regular expression to match various price formats
-                match = re.search(r"\$\d{1,3}(?:,\d{3})*(?:\.\d{0,2})?", price)
-                if match:
-                    # Removing commas and dollar sign, and converting to float
-                    return float(match.group(0).replace(",", "").replace("$", ""))
-                else:
-                    # If no price is found, return None
-                    logger.exception(
-                        "%s information could not be extracted from %s, skipping item..",
-                        class_name,
-                        price,
-                    )
-                    return None
-            except ValueError:
-                # If conversion fails, return None
-                logger.exception(
-                    "%s information could not be extracted from %s, skipping item..",
-                    class_name,
-                    price,
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning("%s element not found, skipping item..", class_name)
-            return None
+        return _parse_price(product.get("buy_price"), "priceView-hero-price")
 
     @staticmethod
-    def get_product_original_price(element: WebElement) -> float | None:
+    def get_product_original_price(product: dict) -> float | None:
         """Extract the original price of product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             price: The product original price.
         """
-        try:
-            class_name = "pricing-price__regular-price-content"
-            price = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format(class_name),
-            ).text
-            try:
-                # Regular expression to match various price formats
-                match = re.search(r"\$\d{1,3}(?:,\d{3})*(?:\.\d{0,2})?", price)
-                if match:
-                    # Removing commas and dollar sign, and converting to float
-                    return float(match.group(0).replace(",", "").replace("$", ""))
-                else:
-                    # If no price is found, return None
-                    logger.exception(
-                        "%s information could not be extracted from %s, skipping item..",
-                        class_name,
-                        price,
-                    )
-                    return None
-            except ValueError:
-                # If conversion fails, return None
-                logger.exception(
-                    "%s information could not be extracted from %s, skipping item..",
-                    class_name,
-                    price,
-                )
-                return None
-        except NoSuchElementException:
-            logger.warning("%s element not found, skipping item..", class_name)
-            return None
+        return _parse_price(
+            product.get("original_price"), "pricing-price__regular-price-content"
+        )
 
     @staticmethod
-    def get_product_title(element: WebElement) -> str | None:
+    def get_product_title(product: dict) -> str | None:
         """Extract the product title given by the retailer.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             title: The title of product.
         """
-        try:
-            return element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("sku-title")
-            ).text
-        except NoSuchElementException:
+        title = product.get("title")
+        if title is None:
             logger.warning("Cannot fetch product title, marking as null..")
-            return None
+        return title
 
     @staticmethod
-    def get_product_rating(element: WebElement) -> float | None:
+    def get_product_rating(product: dict) -> float | None:
         """Extract the product rating on the retailer website.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             rating: The product rating out of scale of 5.
         """
-        try:
-            reviews = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format("c-ratings-reviews"),
-            ).text
-            try:
-                # Extract the float rating
-                rating_match = re.search(r"Rating (\d+(\.\d+)?) out of", reviews)
-                rating = float(rating_match.group(1)) if rating_match else None
-                return rating
-            except ValueError:
-                logger.exception(
-                    "Review information could not be extracted from %s, skipping item..",
-                    reviews,
-                )
-                # Return None for both if any conversion fails
-                return None
-        except NoSuchElementException:
+        reviews = product.get("reviews")
+        if reviews is None:
             logger.warning("Rating element not found, skipping item..")
             return None
+        return _parse_reviews(reviews)[0]
 
     @staticmethod
-    def get_product_review_count(element: WebElement) -> int | None:
+    def get_product_review_count(product: dict) -> int | None:
         """Extract the number of reviews of the product.
 
         Args:
-            element: The product web element.
+            product: The raw product fields.
 
         Returns:
             review_count: The number of reviews of the product in the retailer website.
         """
-        try:
-            reviews = element.find_element(
-                by=By.CSS_SELECTOR,
-                value='[class^="{}"]'.format("c-ratings-reviews"),
-            ).text
-            try:
-                # Extract the integer (number of reviews) and remove commas
-                reviews_match = re.search(r"with ([\d,]+) reviews", reviews)
-                reviews = (
-                    int(reviews_match.group(1).replace(",", ""))
-                    if reviews_match
-                    else None
-                )
-
-                return reviews
-            except ValueError:
-                logger.exception(
-                    "Review count information could not be extracted from %s, skipping item..",
-                    reviews,
-                )
-                # Return None for both if any conversion fails
-                return None
-        except NoSuchElementException:
+        reviews = product.get("reviews")
+        if reviews is None:
             logger.warning("Review count element not found, skipping item..")
             return None
+        return _parse_reviews(reviews)[1]
 
     @staticmethod
-    def get_product_additional_attributes(element: WebElement) -> dict | None:
+    def get_product_additional_attributes(product: dict) -> dict | None:
         """Gets product additional attributes that may exist in the retailer page.
 
         Args:
-            element: Product web element.
+            product: The raw product fields.
         """
-        try:
-            description = element.find_element(
-                by=By.CSS_SELECTOR, value='[class^="{}"]'.format("sku-model")
-            ).text
-            # Regular expression pattern
-            pattern = r"Model: ([^\n]+)"
-            # Search for matches
-            match = re.search(pattern, description)
-            if match:
-                # Extracting Model values if exist
-                model = match.group(1) if match.group(1) else None
-                return {"model": model}
-            else:
-                logger.exception(
-                    "Model could not be parsed from description %s, skipping item..",
-                    description,
-                )
-                return None
-        except (NoSuchElementException, ValueError):
-            logger.exception("Model element not found, skipping item..")
+        description = product.get("sku_model")
+        if description is None:
+            logger.error("Model element not found, skipping item..")
+            return None
+        # Extracting Model values if exist
+        _, model = _parse_sku_model(description)
+        if model is not None:
+            return {"model": model}
+        else:
+            logger.error(
+                "Model could not be parsed from description %s, skipping item..",
+                description,
+            )
             return None
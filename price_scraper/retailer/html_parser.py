@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+# Attributes holding URLs, resolved against the page URL as the DOM properties read by Selenium
+_URL_ATTRIBUTES = frozenset({"href", "src"})
+
+
+def _read_text(node: LexborNode) -> str:
+    """Reads the text of the node, similar to Selenium text.
+
+    Args:
+        node: The parsed HTML node.
+    """
+    # NOTE collapse whitespace of nested text nodes, as rendered text of inline elements
+    return " ".join(node.text(separator=" ").split())
+
+
+def _read_field(
+    node: LexborNode, attribute: str | None, base_url: str | None = None
+) -> str | None:
+    """Reads the text or attribute of the node, similar to Selenium text and get_attribute.
+
+    Args:
+        node: The parsed HTML node.
+        attribute: The attribute name to read, or None to read the node text.
+        base_url: The page URL to resolve relative URL attributes against, e.g. href.
+    """
+    if attribute is None:
+        return _read_text(node)
+    if attribute == "innerHTML":
+        return node.inner_html
+    value = node.attributes.get(attribute)
+    if value is not None and base_url and attribute in _URL_ATTRIBUTES:
+        return urljoin(base_url, value)
+    return value
+
+
+def parse_html(html: str) -> LexborHTMLParser:
+    """Parses the page HTML once, so it can be queried by multiple extractions.
+
+    Args:
+        html: The HTML of the page.
+
+    Returns:
+        tree: The parsed HTML tree.
+    """
+    return LexborHTMLParser(html)
+
+
+def select_texts(html: str | LexborHTMLParser, selector: str) -> List[str]:
+    """Reads the text of all nodes matching the selector.
+
+    Args:
+        html: The HTML of the page, or its parsed tree.
+        selector: The CSS selector of the nodes.
+
+    Returns:
+        texts: The text of each matched node.
+    """
+    if isinstance(html, str):
+        html = parse_html(html)
+    return [_read_text(node) for node in html.css(selector)]
+
+
+def extract_products(
+    html: str | LexborHTMLParser,
+    product_selector: str,
+    fields: Dict[str, Tuple[str, str | None]],
+    base_url: str | None = None,
+) -> List[dict]:
+    """Extracts the raw fields of all products from the page HTML, parsed in C by selectolax
+    instead of querying each product element over WebDriver.
+
+    Args:
+        html: The HTML of the page, e.g. Selenium driver page_source, or its parsed tree.
+        product_selector: The CSS selector of product elements.
+        fields: The raw fields to read off each product, given as
+            field name: (CSS selector within the product, attribute name or None for its text).
+        base_url: The page URL to resolve relative URL attributes against, e.g. href, so links
+            match the absolute URLs read in the web browser.
+
+    Returns:
+        products: List of raw product fields, a missing field is set to None.
+    """
+    if isinstance(html, str):
+        html = parse_html(html)
+    products = []
+    for item in html.css(product_selector):
+        product = {}
+        for key, (selector, attribute) in fields.items():
+            node = item.css_first(selector)
+            product[key] = (
+                None if node is None else _read_field(node, attribute, base_url)
+            )
+        products.append(product)
+    return products
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from importlib.util import find_spec
+import logging
+from typing import List
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# NOTE retailer pages reject requests that do not look like they come from a web browser
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64; rv:122.0) Gecko/20100101 Firefox/122.0"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+# HTTP/2 is only available with the h2 package, i.e. the httpx[http2] extra
+_HTTP2 = find_spec("h2") is not None
+
+
+def _get_proxy(proxy_kwargs: dict | None) -> str | None:
+    """Gets the proxy URL from the Selenium Firefox proxy configuration.
+
+    Args:
+        proxy_kwargs: Selenium Firefox proxy configuration, e.g. sslProxy "<PROXY>:<PORT>".
+
+    Returns:
+        proxy: The proxy URL, or None if no proxy is configured.
+    """
+    if not proxy_kwargs:
+        return None
+    proxy = proxy_kwargs.get("sslProxy") or proxy_kwargs.get("httpProxy")
+    if proxy and "://" not in proxy:
+        proxy = f"http://{proxy}"
+    return proxy
+
+
+async def _fetch_all(
+    urls: List[str], timeout: float, proxy: str | None
+) -> List[str | None]:
+    async with httpx.AsyncClient(
+        headers=_HEADERS,
+        http2=_HTTP2,
+        proxy=proxy,
+        timeout=timeout,
+        follow_redirects=True,
+    ) as client:
+        responses = await asyncio.gather(
+            *(client.get(url) for url in urls), return_exceptions=True
+        )
+    pages: List[str | None] = []
+    for url, response in zip(urls, responses):
+        if isinstance(response, BaseException):
+            logger.warning("Failed to fetch '%s' over HTTP: %s", url, response)
+            pages.append(None)
+        elif response.status_code != httpx.codes.OK:
+            logger.warning(
+                "Failed to fetch '%s' over HTTP, status code: %d",
+                url,
+                response.status_code,
+            )
+            pages.append(None)
+        else:
+            pages.append(response.text)
+    return pages
+
+
+def fetch_pages(
+    urls: List[str], timeout: float, proxy_kwargs: dict | None = None
+) -> List[str | None]:
+    """Fetches the HTML of the pages concurrently over plain HTTP, skipping the web browser.
+    Only useful for server rendered pages, since no JavaScript is run.
+
+    Args:
+        urls: The page URLs to fetch.
+        timeout: The request timeout in seconds.
+        proxy_kwargs: Selenium Firefox proxy configuration, reused for the HTTP requests.
+
+    Returns:
+        pages: The HTML of each page in the order of urls, None for the pages that failed.
+    """
+    if not urls:
+        return []
+    return asyncio.run(_fetch_all(urls, timeout, _get_proxy(proxy_kwargs)))
@@ -1,11 +1,10 @@
 from abc import ABC, abstractmethod
 import logging
-from typing import List
 
-from price_scraper.models import ProductPrice, ProductMetadata
+from price_scraper.models import ProductMetadataBatch, ProductPriceBatch
 
 
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
 
 
 class BaseStorage(ABC):
@@ -19,13 +18,18 @@ class BaseStorage(ABC):
     @abstractmethod
     def save(
         self,
-        product_prices: List[ProductPrice],
-        product_metadata: List[ProductMetadata],
+        product_prices: ProductPriceBatch,
+        product_metadata: ProductMetadataBatch,
     ):
         """This method stores product information to the storage.
 
         Args:
-            product_prices: The list of product prices.
-            product_metadata: The list of product metadata.
+            product_prices: The product price rows, one list per ProductPrice column.
+            product_metadata: The product metadata rows, one list per ProductMetadata column.
         """
         raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        """This method releases the storage connection once the storage is no longer used."""
+        raise NotImplementedError
@@ -1,17 +1,29 @@
 import logging
 import os
-from typing import List
 
-from sqlalchemy import create_engine
+from sqlalchemy import cast, create_engine, JSON, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert, JSONB
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.schema import Index
 
 from price_scraper.storage.base import BaseStorage
-from price_scraper.models import Base, ProductPrice, ProductMetadata
+from price_scraper.models import (
+    Base,
+    ProductMetadata,
+    ProductMetadataBatch,
+    ProductPrice,
+    ProductPriceBatch,
+)
 
+logger = logging.getLogger(__name__)
 
-logger = logging.getLogger()
+# The database URLs whose tables are already created in this process
+_created_databases = set()
+
+
+def _comparable(column):
+    """Casts json columns to jsonb, so they can be compared."""
+    return cast(column, JSONB) if isinstance(column.type, JSON) else column
 
 
 class PostgresStorage(BaseStorage):
@@ -31,47 +43,84 @@ class PostgresStorage(BaseStorage):
         postgres_port: int = 5432,
         database_name: str = "postgres",
     ):
-        # define postgres table indecies for efficient queries at read
-        Index(
-            "idx_product_price_date_product_id",
-            ProductPrice.date,
-            ProductPrice.product_id,
-        )
-        Index("idx_product_price_product_id", ProductPrice.product_id)
-        Index("idx_product_metadata_category", ProductMetadata.category)
-        Index("idx_product_metadata_brand", ProductMetadata.brand)
         # Connect to the database
         engine = create_engine(
             "postgresql+psycopg2://"
             # NOTE postgres username and password are passed via env vars for security
             f"{os.environ['POSTGRES_USER']}:{os.environ['POSTGRES_PASSWORD']}"
-            f"@{postgres_url}:{postgres_port}/{database_name}"
+            f"@{postgres_url}:{postgres_port}/{database_name}",
+            # NOTE executemany INSERTs are sent as multi row VALUES statements, one per page of
+            # rows, and other executemany statements are batched by psycopg2 execute_batch
+            executemany_mode="values_plus_batch",
+            insertmanyvalues_page_size=1000,
         )
         Session = sessionmaker(bind=engine)
         self.session = Session()
-        # Register table models to the engine
-        Base.metadata.create_all(engine)
+        # Register table models and their indexes to the engine, once per database
+        database = f"{postgres_url}:{postgres_port}/{database_name}"
+        if database not in _created_databases:
+            Base.metadata.create_all(engine)
+            _created_databases.add(database)
+
+    def _upsert_metadata(self, product_metadata: ProductMetadataBatch) -> int:
+        """Inserts or updates the product metadata rows with a single INSERT ... ON CONFLICT
+        statement, instead of a select and an insert or update per row with merge.
+
+        Args:
+            product_metadata: The product metadata rows.
+
+        Returns:
+            num_updated: The number of inserted or changed product metadata rows.
+        """
+        # NOTE postgres rejects a statement updating the same row twice, so the last row of a
+        # product scraped more than once wins, as it would with merge
+        rows = list(
+            {row["product_id"]: row for row in product_metadata.rows()}.values()
+        )
+        if not rows:
+            return 0
+        stmt = pg_insert(ProductMetadata).values(rows)
+        columns = [
+            column
+            for column in ProductMetadata.__table__.columns
+            if not column.primary_key
+        ]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductMetadata.product_id],
+            set_={column.name: stmt.excluded[column.name] for column in columns},
+            # NOTE unchanged rows are not rewritten, json has no equality operator in postgres
+            # so it is compared as jsonb
+            where=tuple_(*(_comparable(column) for column in columns)).is_distinct_from(
+                tuple_(*(_comparable(stmt.excluded[column.name]) for column in columns))
+            ),
+        )
+        # NOTE insert statements return a cursor result, which has the row count
+        return self.session.execute(stmt).rowcount  # type: ignore[attr-defined]
 
     def save(
         self,
-        product_prices: List[ProductPrice],
-        product_metadata: List[ProductMetadata],
+        product_prices: ProductPriceBatch,
+        product_metadata: ProductMetadataBatch,
     ):
         """This method stores or updates product metadata based on category and brand.
 
         Args:
-            product_metadata: The list of product metadata.
+            product_prices: The product price rows.
+            product_metadata: The product metadata rows.
         """
         try:
-            # Iterate through the list and use merge for each object
-            for obj in product_metadata:
-                self.session.merge(obj)
-            self.session.add_all(product_prices)
+            num_updated = self._upsert_metadata(product_metadata)
+            ProductPrice.bulk_insert(self.session, product_prices.rows())
             self.session.commit()
             logger.info(
-                "Success: %d product are added to the database.",
+                "Success: %d product are added to the database, "
+                "%d new product metadata updated.",
                 len(product_metadata),
+                num_updated,
             )
         except SQLAlchemyError as e:
             self.session.rollback()
             logger.exception("Cannot commit product to the db, error: %s", e)
+
+    def close(self):
+        self.session.close()
@@ -1,18 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date
+from functools import lru_cache
+import json
 import logging
-from typing import List
+import re
+import threading
+from typing import Dict, Iterator, Tuple
 
-import boto3
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+from sqlalchemy import JSON
 
 from price_scraper.enums import Retailer
 from price_scraper.storage.base import BaseStorage
-from price_scraper.models import Base, ProductPrice, ProductMetadata
+from price_scraper.models import (
+    ProductMetadata,
+    ProductMetadataBatch,
+    ProductPriceBatch,
+)
 
+logger = logging.getLogger(__name__)
 
-logger = logging.getLogger()
+# The in memory DuckDB databases by S3 region, shared by the storages of this process
+_databases: Dict[str, duckdb.DuckDBPyConnection] = {}
+_databases_lock = threading.Lock()
+
+_META_COLUMNS = tuple(column.name for column in ProductMetadata.__table__.columns)
+# NOTE the retailer enum and JSON attributes are stored as strings
+_META_SCHEMA = pa.schema([(name, pa.string()) for name in _META_COLUMNS])
+# NOTE the types match the FLOAT and INTEGER columns of the ProductPrice model, so the parquet
+# files keep the schema they were written with before
+_PRICE_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("product_id", pa.string()),
+        ("date", pa.date32()),
+        ("buy_price", pa.float32()),
+        ("original_price", pa.float32()),
+        ("coupon_value", pa.float32()),
+        ("rating", pa.float32()),
+        ("review_count", pa.int32()),
+    ]
+)
+_ROW_GROUP_SIZE = 128_000
+_COMPRESSION = {"compression": "zstd", "compression_level": 3}
+# Parquet encodings by column, the columns that are not dictionary encoded are PLAIN unless
+# given an encoding, e.g. the unique product ids where a dictionary is pure overhead
+# NOTE the brand, category and retailer of a metadata file are all the same
+_META_ENCODINGS = {"use_dictionary": ["retailer", "brand", "category"]}
+# NOTE each price file holds a single date and the ratings are one decimal out of 5
+_PRICE_ENCODINGS = {
+    "use_dictionary": ["rating"],
+    "column_encoding": {
+        "date": "DELTA_BINARY_PACKED",
+        "buy_price": "BYTE_STREAM_SPLIT",
+        "original_price": "BYTE_STREAM_SPLIT",
+        "coupon_value": "BYTE_STREAM_SPLIT",
+        "review_count": "DELTA_BINARY_PACKED",
+    },
+}
+_PRICE_WRITE_OPTIONS = ds.ParquetFileFormat().make_write_options(
+    **_COMPRESSION, **_PRICE_ENCODINGS
+)
+# Prices are stored as a hive partitioned dataset, e.g. year=2024/month=2/day=4/retailer=AMZ,
+# so readers can prune the partitions of the dates and retailers they query
+_PRICE_PARTITIONING = ds.partitioning(
+    pa.schema(
+        [
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+            ("day", pa.int8()),
+            ("retailer", pa.string()),
+        ]
+    ),
+    flavor="hive",
+)
+# NOTE the region is the only value DuckDB cannot bind in the secret statement
+_REGION_RE = re.compile(r"[a-z0-9-]+")
+# NOTE JSON columns are compared as normalized JSON instead of text, so the attributes of
+# existing files serialized with other whitespace are not seen as changed
+_META_COMPARED = ", ".join(
+    f"json({{side}}.{column.name})"
+    if isinstance(column.type, JSON)
+    else f"{{side}}.{column.name}"
+    for column in ProductMetadata.__table__.columns
+    if column.name != "product_id"
+)
+# Merges the existing product metadata file with the scraped products in a single full join,
+# the scraped row of a new or changed product wins, and flags the new and changed products
+# NOTE unchanged products keep their existing row, so it is written back as it was read
+_MERGE_META_SQL = (
+    "SELECT "
+    + ", ".join(
+        f"CASE WHEN changed THEN incoming_{name} ELSE {name} END AS {name}"
+        for name in _META_COLUMNS
+    )
+    + ", changed FROM (SELECT existing.*, "
+    + ", ".join(f"incoming.{name} AS incoming_{name}" for name in _META_COLUMNS)
+    + ", incoming.product_id IS NOT NULL AND (existing.product_id IS NULL OR ("
+    + _META_COMPARED.format(side="incoming")
+    + ") IS DISTINCT FROM ("
+    + _META_COMPARED.format(side="existing")
+    + ")) AS changed "
+    "FROM read_parquet(?) AS existing FULL OUTER JOIN incoming_meta AS incoming "
+    "ON existing.product_id = incoming.product_id);"
+)
+
+
+def _get_database(region: str) -> duckdb.DuckDBPyConnection:
+    """Gets the in memory DuckDB database of the region, creating it on first use with the
+    extensions loaded, and refreshes its S3 secret.
+
+    Args:
+        region: S3 client region.
+
+    Returns:
+        database: The DuckDB database connection.
+
+    Raises:
+        ValueError: If the region is not a valid AWS region name.
+    """
+    if not _REGION_RE.fullmatch(region):
+        raise ValueError(f"Invalid S3 region: {region!r}")
+    with _databases_lock:
+        if region not in _databases:
+            database = duckdb.connect(":memory:")
+            database.execute("LOAD httpfs; LOAD aws;")
+            _databases[region] = database
+        # Set S3 auth and region, without the keys ending up in the SQL
+        # NOTE the credential chain is resolved when the secret is created, so it is replaced
+        # for every storage, otherwise a long running process keeps reading with the temporary
+        # credentials of its first storage after they expire
+        _databases[region].execute(
+            "CREATE OR REPLACE SECRET s3_storage "
+            f"(TYPE S3, PROVIDER CREDENTIAL_CHAIN, REGION '{region}');"
+        )
+        return _databases[region]
+
+
+@lru_cache(maxsize=4096)
+def _get_s3_paths(bucket_and_prefix: str, category: str, brand: str) -> Tuple[str, str]:
+    """Gets the S3 paths of the brand data within the category, built once per brand and
+    category instead of on every save.
+
+    Args:
+        bucket_and_prefix: The bucket and prefix to use for storing scraped data.
+        category: The category of the scraped products.
+        brand: The name of product brand.
+
+    Returns:
+        metadata_path: The S3 URI of the product metadata parquet file.
+        prices_path: The S3 URI of the product prices parquet dataset.
+    """
+    brand_path = f"{bucket_and_prefix}/{category}/{brand}"
+    return f"{brand_path}/metadata.parquet", f"{brand_path}/prices"
 
 
 class S3Storage(BaseStorage):
@@ -25,178 +171,248 @@ class S3Storage(BaseStorage):
         region: S3 client region.
     """
 
-    num_updated_product_metadata = 0
-
     def __init__(self, bucket_and_prefix: str, region: str):
         self.bucket_and_prefix = bucket_and_prefix
-        # Creating in memory duck db database session
+        # Creating a connection to the in memory duck db database of the region
         # TODO persist better with .db file.
-        engine = create_engine("duckdb:///:memory:")
-        Session = sessionmaker(bind=engine)
-        self.session = Session()
-        # Register table models to the engine
-        Base.metadata.create_all(engine)
-        # Set S3 auth and region
-        credentials = boto3.Session().get_credentials()
-        self.session.execute(text("LOAD httpfs;"))
-        self.session.execute(text(f"SET s3_region = '{region}';"))
-        self.session.execute(
-            text(f"SET s3_access_key_id = '{credentials.access_key}';")
-        )
-        self.session.execute(
-            text(f"SET s3_secret_access_key = '{credentials.secret_key}';")
-        )
+        # NOTE a cursor is a new connection to the same database, with its own registered views,
+        # so storages used from different threads do not share state
+        self.connection = _get_database(region).cursor()
+        # NOTE parquet files are written by Arrow, DuckDB httpfs is only used to read them,
+        # both resolve the credentials from the AWS default credential chain
+        self.filesystem = fs.S3FileSystem(region=region)
 
     def save(
         self,
-        product_prices: List[ProductPrice],
-        product_metadata: List[ProductMetadata],
+        product_prices: ProductPriceBatch,
+        product_metadata: ProductMetadataBatch,
     ):
         if len(product_metadata) == 0:
             logger.warning("Nothing to store. Skipping save..")
             return
 
-        category: str = product_metadata[0].category
-        brand: str = product_metadata[0].brand
-        retailer: Retailer = product_metadata[0].retailer
-        dt: date = product_prices[0].date
+        category: str = product_metadata.category[0]
+        brand: str = product_metadata.brand[0]
+        retailer: Retailer = product_metadata.retailer[0]
+        dt: date = product_prices.date[0]
 
-        self._save_metadata(
-            product_metadata=product_metadata,
-            category=category,
-            brand=brand,
-        )
-        self._save_prices(
-            product_prices=product_prices,
-            category=category,
-            brand=brand,
-            retailer=retailer,
-            dt=dt,
-        )
+        # NOTE the metadata file and price partition are disjoint S3 keys, and only the metadata
+        # merge uses the DuckDB connection, so both are written concurrently
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [
+                pool.submit(
+                    self._save_metadata,
+                    product_metadata=product_metadata,
+                    category=category,
+                    brand=brand,
+                ),
+                pool.submit(
+                    self._save_prices,
+                    product_prices=product_prices,
+                    category=category,
+                    brand=brand,
+                    retailer=retailer,
+                    dt=dt,
+                ),
+            ]
+            for future in futures:
+                future.result()
+
+    def close(self):
+        # NOTE only the storage cursor is closed, the region database is shared by the process
+        self.connection.close()
 
     def _save_metadata(
         self,
         category: str,
         brand: str,
-        product_metadata: List[ProductMetadata],
-    ):
+        product_metadata: ProductMetadataBatch,
+    ) -> int:
         """This method stores or updates product metadata based on category and brand.
 
         Args:
             category: The list of category drill down for the product data that is scraped.
             brand: The name of product brand.
-            product_metadata: The list of product metadata.
+            product_metadata: The product metadata rows.
+
+        Returns:
+            num_updated: The number of inserted or changed product metadata rows stored.
         """
         # Store product metadata scraped from the page
         logger.info("Fetching existing product metadata for category and brand..")
-        meta_parquet_s3_path = (
-            f"{self.bucket_and_prefix}/{category}/{brand}/metadata.parquet"
-        )
+        meta_parquet_s3_path, _ = _get_s3_paths(self.bucket_and_prefix, category, brand)
         try:
-            self.session.execute(
-                text(
-                    "INSERT INTO product_metadata "
-                    f"SELECT * FROM read_parquet('{meta_parquet_s3_path}');"
-                )
+            product_metadata_table, num_updated = self._merge_metadata(
+                product_metadata, meta_parquet_s3_path
             )
-            # Commit if successful
-            self.session.commit()
-            logger.info("Existing metadata loaded.")
-        except SQLAlchemyError:
-            self.session.rollback()
+        except (duckdb.Error, pa.ArrowException, OSError) as e:
+            # NOTE writing the scraped metadata alone would drop the existing products
+            logger.exception(
+                "Cannot merge product metadata, skipping storage write: %s", e
+            )
+            return 0
+        if num_updated == 0:
             logger.info(
-                "No existing metadata for brand and category found, starting from scratch.."
+                "No product metadata is found to be different from before, "
+                "skipping storage write."
             )
-        try:
-            # # Iterate through the list and use merge for each object
-            for obj in product_metadata:
-                self._update_or_insert_meta(obj)
-            if self.num_updated_product_metadata == 0:
-                logger.info(
-                    "No product metadata is found to be different from before, "
-                    "skipping storage write."
-                )
-                return
-            self.session.commit()
-        except SQLAlchemyError as e:
-            self.session.rollback()
-            logger.exception("Cannot commit product metadata to the db, error: %s", e)
+            return 0
 
         try:
-            self.session.execute(
-                text(
-                    f"COPY product_metadata TO '{meta_parquet_s3_path}' (FORMAT PARQUET);"
-                )
+            self._write_parquet(
+                product_metadata_table, meta_parquet_s3_path, _META_ENCODINGS
             )
             logger.info("Product metadata is stored to %s.", meta_parquet_s3_path)
-        except SQLAlchemyError as e:
-            self.session.rollback()
+        except (pa.ArrowException, OSError) as e:
             logger.exception("Failed to store product_metadata table to S3: %s", e)
+            return 0
         logger.info(
-            "Stored product metadata, %d new product metadata updated.",
-            self.num_updated_product_metadata,
+            "Stored product metadata, %d new product metadata updated.", num_updated
         )
+        return num_updated
 
     def _save_prices(
         self,
-        product_prices: List[ProductPrice],
+        product_prices: ProductPriceBatch,
         category: str,
         brand: str,
         retailer: Retailer,
         dt: date,
     ):
         logger.info("Storing product data..")
-        data_parquet_s3_path = (
-            f"{self.bucket_and_prefix}/{category}/{brand}/ts/"
-            f"{dt.strftime('%Y/%m/%d')}/{retailer.name}.parquet"
+        _, prices_s3_path = _get_s3_paths(self.bucket_and_prefix, category, brand)
+        # NOTE prices are only written to S3, so they are written straight from the Arrow table
+        # instead of being inserted into the product_price table first
+        # NOTE the prebuilt schema lets Arrow fill the typed buffers straight from the column lists,
+        # without inferring the types
+        incoming_prices = pa.Table.from_pydict(
+            product_prices.columns(), schema=_PRICE_SCHEMA
         )
+        dates = incoming_prices.column("date")
+        partitions = {
+            "year": pc.year(dates).cast(pa.int16()),
+            "month": pc.month(dates).cast(pa.int8()),
+            "day": pc.day(dates).cast(pa.int8()),
+            "retailer": pa.repeat(retailer.name, incoming_prices.num_rows),
+        }
+        for name, values in partitions.items():
+            incoming_prices = incoming_prices.append_column(name, values)
         try:
-            self.session.add_all(product_prices)
-            self.session.commit()
-        except Exception as e:
-            self.session.rollback()
-            logger.exception("Failed to add new scraped data: %s", e)
-        try:
-            self.session.execute(
-                text(
-                    f"COPY product_price TO '{data_parquet_s3_path}' (FORMAT PARQUET);"
-                )
+            # NOTE the files of the written partitions are replaced, so scraping a retailer twice
+            # on the same day keeps the latest prices as before
+            ds.write_dataset(
+                incoming_prices,
+                prices_s3_path.removeprefix("s3://"),
+                format="parquet",
+                partitioning=_PRICE_PARTITIONING,
+                basename_template="part-{i}.parquet",
+                filesystem=self.filesystem,
+                file_options=_PRICE_WRITE_OPTIONS,
+                max_rows_per_group=_ROW_GROUP_SIZE,
+                existing_data_behavior="delete_matching",
             )
-            self.session.commit()
-            logger.info("Product data is stored to %s.", data_parquet_s3_path)
-        except SQLAlchemyError as e:
-            self.session.rollback()
+            logger.info(
+                "Product data is stored to %s/year=%d/month=%d/day=%d/retailer=%s.",
+                prices_s3_path,
+                dt.year,
+                dt.month,
+                dt.day,
+                retailer.name,
+            )
+        except (pa.ArrowException, OSError) as e:
             logger.exception("Failed to store product data table to S3: %s", e)
 
-    def _update_or_insert_meta(self, obj: ProductMetadata):
-        """Updates or insert product metadata into db.
+    def _merge_metadata(
+        self, product_metadata: ProductMetadataBatch, meta_parquet_s3_path: str
+    ) -> Tuple[pa.Table, int]:
+        """Merges the scraped product metadata into the existing metadata file with a single set
+        based query, the rows are handed to DuckDB as a registered Arrow table and the existing
+        file is streamed through the join, instead of being loaded into a table first.
+
+        Args:
+            product_metadata: The product metadata rows.
+            meta_parquet_s3_path: The S3 URI of the existing product metadata parquet file.
+
+        Returns:
+            product_metadata_table: The merged product metadata.
+            num_updated: The number of inserted or changed product metadata rows.
+        """
+        columns = product_metadata.columns()
+        incoming_meta = pa.Table.from_pydict(
+            {
+                **columns,
+                "retailer": [retailer.name for retailer in columns["retailer"]],
+                "additional_attributes": [
+                    None if attributes is None else json.dumps(attributes)
+                    for attributes in columns["additional_attributes"]
+                ],
+            },
+            schema=_META_SCHEMA,
+        )
+        # NOTE a product must be a single row of the merged metadata, so the last row of a
+        # product scraped more than once wins, the rows are picked by Arrow instead of per column
+        last_rows = {
+            product_id: i for i, product_id in enumerate(columns["product_id"])
+        }
+        if len(last_rows) < incoming_meta.num_rows:
+            incoming_meta = incoming_meta.take(list(last_rows.values()))
+        # NOTE a missing file is checked with a HEAD request, instead of a failing read
+        if not self._exists(meta_parquet_s3_path):
+            logger.info(
+                "No existing metadata for brand and category found, starting from scratch.."
+            )
+            return incoming_meta, incoming_meta.num_rows
+        with self._register("incoming_meta", incoming_meta):
+            # NOTE the path is bound as a parameter, so the statement text is the same for
+            # every brand and category, and a quote in the path cannot break the SQL
+            merged_meta = self.connection.execute(
+                _MERGE_META_SQL, [meta_parquet_s3_path]
+            ).arrow()
+        logger.info("Existing metadata merged.")
+        num_updated = pc.sum(merged_meta.column("changed")).as_py() or 0
+        return merged_meta.drop_columns(["changed"]).cast(_META_SCHEMA), num_updated
+
+    @contextmanager
+    def _register(self, name: str, table: pa.Table) -> Iterator[None]:
+        """Registers the Arrow table as a DuckDB view of the storage connection, without
+        copying it, for the duration of the context.
+
+        Args:
+            name: The view name to query the table with.
+            table: The Arrow table.
+        """
+        self.connection.register(name, table)
+        try:
+            yield
+        finally:
+            self.connection.unregister(name)
+
+    def _exists(self, s3_path: str) -> bool:
+        """Checks whether the S3 object exists.
+
+        Args:
+            s3_path: The S3 URI of the object.
+
+        Returns:
+            exists: False if the object is not found.
+        """
+        file_info = self.filesystem.get_file_info(s3_path.removeprefix("s3://"))
+        return file_info.type != fs.FileType.NotFound
+
+    def _write_parquet(self, table: pa.Table, s3_path: str, encodings: dict):
+        """Writes the Arrow table to S3 as a parquet file in a single pass, instead of
+        COPYing it through the DuckDB httpfs writer.
 
         Args:
-            obj: New product metadata instance.
+            table: The Arrow table.
+            s3_path: The S3 URI of the parquet file.
+            encodings: The use_dictionary and column_encoding options of the table columns.
         """
-        is_diff = False
-        # get existing row
-        existing_row = (
-            self.session.query(ProductMetadata)
-            .filter(ProductMetadata.product_id == obj.product_id)
-            .first()
+        pq.write_table(
+            table,
+            s3_path.removeprefix("s3://"),
+            filesystem=self.filesystem,
+            row_group_size=_ROW_GROUP_SIZE,
+            **_COMPRESSION,
+            **encodings,
         )
-        # update existing row if any changes from before, or insert new product metadata
-        if existing_row:
-            # If exists and different, update the existing row with object attributes
-            for key, value in vars(obj).items():
-                if (
-                    # NOTE we don't care sqlalchemy attributes nor id which can change
-                    # by uuid generation
-                    key not in ["_sa_instance_state", "id"]
-                    and value != getattr(existing_row, key)
-                ):
-                    setattr(existing_row, key, value)
-                    is_diff = True
-        else:
-            # If doesn't exist, add object as a new row
-            self.session.add(obj)
-            is_diff = True
-        # increase counter if a newly updated/found product
-        if is_diff:
-            self.num_updated_product_metadata += 1
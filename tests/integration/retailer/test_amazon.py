@@ -5,7 +5,7 @@ from price_scraper.cli import scrape, PriceScraperSchema
 
 
 @allure.epic("Amazon")
-@allure.parent_suite('Brand grid product page')
+@allure.parent_suite("Brand grid product page")
 @pytest.mark.amazon
 @pytest.mark.selenium
 @pytest.mark.brand_grid
@@ -22,7 +22,11 @@ def test_amazon():
         max_pagination=2,
     )
 
-    assert any([0 < (price.buy_price or 0) < 10_000 for price in scraper.product_prices])
-    assert any([price.rating is not None for price in scraper.product_prices])
-    assert any([price.review_count is not None for price in scraper.product_prices])
-    assert any([price.product_id is not None for price in scraper.product_metadata])
+    assert any(
+        [0 < (price or 0) < 10_000 for price in scraper.product_prices.buy_price]
+    )
+    assert any([rating is not None for rating in scraper.product_prices.rating])
+    assert any([count is not None for count in scraper.product_prices.review_count])
+    assert any(
+        [product_id is not None for product_id in scraper.product_metadata.product_id]
+    )
@@ -0,0 +1,36 @@
+from unittest.mock import call, MagicMock, patch
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from price_scraper.retailer import amazon, base
+from price_scraper.retailer.base import BaseRetailer
+
+
+@pytest.mark.parametrize("side_effect", [None, TimeoutException])
+@patch.dict(base._DRIVER_POOL, clear=True)
+@patch.object(BaseRetailer, "scrape_page")
+@patch.object(amazon.Amazon, "create_driver")
+def test_paginate_and_scrape_restores_script_timeout(
+    mock_create_driver, mock_scrape_page, side_effect
+):
+    driver = MagicMock()
+    driver.execute_async_script.side_effect = side_effect
+    driver.execute_async_script.return_value = 2
+    mock_create_driver.return_value = driver
+    scraper = amazon.Amazon(
+        brand="apple", category="laptops", timeout=5, max_pagination=3
+    )
+    script_timeouts = []
+
+    def get_products():
+        script_timeouts.append(driver.set_script_timeout.call_args)
+        return []
+
+    with patch.object(scraper, "get_products", side_effect=get_products):
+        scraper.paginate_and_scrape("<URL>")
+
+    # pagination waits for every page, and the products are extracted with the scraper timeout
+    assert driver.set_script_timeout.call_args_list[-2:] == [call(35), call(5)]
+    assert script_timeouts == [call(5)]
+    mock_scrape_page.assert_called_once_with("<URL>")
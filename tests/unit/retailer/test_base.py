@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from price_scraper.retailer import base
+
+
+class _Retailer(base.BaseRetailer):
+    product_selector = ".item"
+    product_fields = {"title": (".title", None), "link": (".title", "href")}
+
+    @staticmethod
+    def get_product_id(product: dict):
+        return product.get("id")
+
+
+@pytest.fixture(autouse=True)
+def driver_pool():
+    with patch.dict(base._DRIVER_POOL, clear=True):
+        yield base._DRIVER_POOL
+
+
+@pytest.fixture
+def created_drivers():
+    drivers = []
+
+    def create_driver():
+        drivers.append(MagicMock())
+        return drivers[-1]
+
+    with patch.object(_Retailer, "create_driver", side_effect=create_driver):
+        yield drivers
+
+
+def test_driver_is_reused_across_scrapers(created_drivers):
+    scraper = _Retailer(brand="brand", category="category", timeout=5)
+    driver = scraper.driver
+    scraper.close()
+
+    # the released driver is taken by the next scraper with the same proxy configuration
+    next_scraper = _Retailer(brand="brand", category="category", timeout=7)
+    assert next_scraper.driver is driver
+    assert created_drivers == [driver]
+    driver.set_page_load_timeout.assert_called_once_with(7)
+    driver.set_script_timeout.assert_called_once_with(7)
+
+    # a scraper with another proxy configuration creates its own driver
+    proxy_scraper = _Retailer(
+        brand="brand", category="category", proxy_kwargs={"sslProxy": "<PROXY>:8080"}
+    )
+    assert created_drivers == [driver, proxy_scraper.driver]
+
+
+def test_acquire_driver_discards_unresponsive_driver(created_drivers, driver_pool):
+    scraper = _Retailer(brand="brand", category="category")
+    dead_driver = MagicMock()
+    dead_driver.set_page_load_timeout.side_effect = WebDriverException
+    scraper.release_driver(dead_driver)
+
+    driver = scraper.acquire_driver()
+
+    assert created_drivers == [driver]
+    dead_driver.quit.assert_called_once()
+    assert driver_pool[base._get_pool_key(None)] == []
+
+
+def test_map_pages_releases_drivers_after_failure(created_drivers, driver_pool):
+    scraper = _Retailer(brand="brand", category="category", max_workers=2)
+
+    def scrape_fn(driver, page_url):
+        raise WebDriverException(f"Failed to load {page_url}")
+
+    with pytest.raises(WebDriverException):
+        scraper.map_pages(["<URL1>", "<URL2>"], scrape_fn)
+
+    # the worker drivers are returned to the pool instead of being leaked
+    assert created_drivers
+    assert sorted(driver_pool[base._get_pool_key(None)], key=id) == sorted(
+        created_drivers, key=id
+    )
+    for driver in created_drivers:
+        driver.quit.assert_not_called()
+
+
+def test_shutdown_driver_pool(driver_pool):
+    driver = MagicMock()
+    gone_driver = MagicMock()
+    gone_driver.quit.side_effect = WebDriverException
+    driver_pool[base._get_pool_key(None)] = [driver]
+    driver_pool[base._get_pool_key({"sslProxy": "<PROXY>:8080"})] = [gone_driver]
+
+    base._shutdown_driver_pool()
+
+    # pooled drivers are quit, ignoring browsers that are already gone
+    driver.quit.assert_called_once()
+    gone_driver.quit.assert_called_once()
+    assert driver_pool == {}
+
+
+def test_get_products_reads_same_fields_either_way():
+    driver = MagicMock(
+        page_source=(
+            '<div class="item"><a class="title" href="/dp/B0001">Laptop</a></div>'
+        ),
+        current_url="https://www.example.com/s?k=laptop",
+    )
+    # the browser reads the href property, which is resolved against the page URL
+    driver.execute_script.return_value = [
+        {"title": "Laptop", "link": "https://www.example.com/dp/B0001"}
+    ]
+    scraper = _Retailer(brand="brand", category="category")
+
+    products = scraper.get_products(driver)
+    with patch.object(base, "extract_products", None):
+        js_products = scraper.get_products(driver)
+
+    assert products == js_products
+    driver.execute_script.assert_called_once_with(
+        base._EXTRACT_JS, _Retailer.product_selector, _Retailer.product_fields
+    )
@@ -0,0 +1,134 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from price_scraper.retailer import best_buy
+from price_scraper.retailer.base import BaseRetailer
+
+_URL = "https://www.bestbuy.com/site/all-laptops/macbooks/pcmcat247400050001.c"
+_PAGE_HTML = """
+<html><body>
+<ol>
+  <li class="list-item lv">
+    <div class="sku-model"><div>Model: MQKP3LL/A</div><div>SKU: 6509650</div></div>
+    <h4 class="sku-title">MacBook Air</h4>
+    <div class="priceView-hero-price"><span>$1,099.99</span></div>
+    <div class="pricing-price__regular-price-content">Was $1,299.99</div>
+    <div class="c-ratings-reviews">Rating 4.8 out of 5 stars with 1,234 reviews</div>
+  </li>
+</ol>
+<ol class="paging-list"><li class="page-item">1</li><li class="page-item">2</li></ol>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize(
+    "description, sku, model",
+    [
+        ("SKU: 6509650 Model: MQKP3LL/A", "6509650", "MQKP3LL/A"),
+        # the page text collapses the line break between the model and the SKU
+        ("Model: MQKP3LL/A SKU: 6509650", "6509650", "MQKP3LL/A"),
+        (
+            "Model: 15-fd0023dx Natural Silver SKU: 6571366",
+            "6571366",
+            "15-fd0023dx Natural Silver",
+        ),
+        ("Model: MQKP3LL/A\nSKU: 6509650", "6509650", "MQKP3LL/A"),
+        (
+            "SKU: 6571366\nModel: 15-fd0023dx Natural Silver",
+            "6571366",
+            "15-fd0023dx Natural Silver",
+        ),
+        ("SKU: 6509650", "6509650", None),
+        ("Model: MQKP3LL/A", None, "MQKP3LL/A"),
+        ("", None, None),
+    ],
+)
+def test__parse_sku_model(description, sku, model):
+    assert best_buy._parse_sku_model(description) == (sku, model)
+
+
+@pytest.mark.parametrize(
+    "reviews, rating, review_count",
+    [
+        ("Rating 4.8 out of 5 stars with 1,234 reviews", 4.8, 1234),
+        ("Rating 5 out of 5 stars with 12 reviews", 5.0, 12),
+        ("Rating 4.5 out of 5 stars\nwith 12 reviews", 4.5, 12),
+        ("Not Yet Reviewed", None, None),
+        ("Rating 4.5 out of 5 stars with , reviews", 4.5, None),
+    ],
+)
+def test__parse_reviews(reviews, rating, review_count):
+    assert best_buy._parse_reviews(reviews) == (rating, review_count)
+
+
+def test_get_product_review_count_without_count():
+    product = {"reviews": "Rating 4.5 out of 5 stars with , reviews"}
+
+    assert best_buy.BestBuy.get_product_rating(product) == 4.5
+    assert best_buy.BestBuy.get_product_review_count(product) is None
+
+
+def test_getters_parse_shared_field_once():
+    product = {
+        "sku_model": "Model: MQKP3LL/A SKU: 6509650",
+        "reviews": "Rating 4.8 out of 5 stars with 1,234 reviews",
+    }
+    best_buy._parse_sku_model.cache_clear()
+    best_buy._parse_reviews.cache_clear()
+
+    assert best_buy.BestBuy.get_product_id(product) == "6509650"
+    assert best_buy.BestBuy.get_product_additional_attributes(product) == {
+        "model": "MQKP3LL/A"
+    }
+    assert best_buy.BestBuy.get_product_rating(product) == 4.8
+    assert best_buy.BestBuy.get_product_review_count(product) == 1234
+
+    # the second getter of a field reuses the cached parse of the first one
+    assert best_buy._parse_sku_model.cache_info()[:2] == (1, 1)
+    assert best_buy._parse_reviews.cache_info()[:2] == (1, 1)
+
+
+@patch.object(best_buy.BestBuy, "map_pages", return_value=[])
+@patch(best_buy.__name__ + ".fetch_pages")
+def test_paginate_and_scrape_fast_path(mock_fetch_pages, mock_map_pages):
+    # the second page fails over HTTP
+    mock_fetch_pages.side_effect = [[_PAGE_HTML], [None]]
+    scraper = best_buy.BestBuy(brand="apple", category="laptops", fast_path=True)
+
+    scraper.paginate_and_scrape(_URL)
+
+    assert scraper.product_metadata.product_id == ["BBY6509650"]
+    assert scraper.product_metadata.title == ["MacBook Air"]
+    assert scraper.product_prices.buy_price == [1099.99]
+    assert scraper.product_prices.original_price == [1299.99]
+    assert scraper.product_prices.rating == [4.8]
+    assert scraper.product_prices.review_count == [1234]
+    mock_fetch_pages.assert_called_with([f"{_URL}?cp=2"], scraper.timeout, None)
+    # only the failed page is loaded in the web browser, and the scraper driver is not created
+    mock_map_pages.assert_called_once_with([f"{_URL}?cp=2"], scraper._scrape_products)
+    assert scraper._driver is None
+
+
+@patch.object(BaseRetailer, "scrape_page")
+@patch.object(best_buy.BestBuy, "get_products", return_value=[])
+@patch.object(best_buy.BestBuy, "_wait_for_products")
+@patch.object(best_buy.BestBuy, "create_driver")
+@patch(best_buy.__name__ + ".fetch_pages", return_value=[None])
+def test_paginate_and_scrape_fast_path_falls_back_to_web_browser(
+    mock_fetch_pages,
+    mock_create_driver,
+    mock_wait_for_products,
+    mock_get_products,
+    mock_scrape_page,
+):
+    mock_create_driver.return_value = MagicMock(**{"execute_script.return_value": "1"})
+    scraper = best_buy.BestBuy(brand="apple", category="laptops", fast_path=True)
+
+    scraper.paginate_and_scrape(_URL)
+
+    # the first page failed over HTTP, so all pages are loaded in the web browser
+    mock_fetch_pages.assert_called_once_with([_URL], scraper.timeout, None)
+    mock_scrape_page.assert_called_once_with(_URL)
+    mock_get_products.assert_called_once_with()
+    assert scraper._driver is mock_create_driver.return_value
@@ -0,0 +1,81 @@
+from price_scraper.retailer import html_parser
+
+_PAGE_HTML = """
+<html><body>
+<div class="item">
+  <a class="title" href="/product/1">Laptop <b>Pro</b>
+    14"</a>
+  <i class="icon"><svg><title>4.5 out of 5</title></svg></i>
+  <span class="price" aria-label="$1,299.99">$1,299.99</span>
+</div>
+<div class="item">
+  <a class="title">Laptop Air</a>
+</div>
+<ul class="paging"><li class="page">1</li><li class="page"> 2 </li></ul>
+</body></html>
+"""
+_FIELDS = {
+    "title": (".title", None),
+    "link": (".title", "href"),
+    "price": (".price", "aria-label"),
+    "rating": (".icon", "innerHTML"),
+}
+
+
+def test_extract_products():
+    products = html_parser.extract_products(_PAGE_HTML, ".item", _FIELDS)
+
+    assert products == [
+        {
+            # nested text is collapsed to single spaces, as rendered text
+            "title": 'Laptop Pro 14"',
+            "link": "/product/1",
+            "price": "$1,299.99",
+            "rating": "<svg><title>4.5 out of 5</title></svg>",
+        },
+        # missing elements and attributes are None
+        {"title": "Laptop Air", "link": None, "price": None, "rating": None},
+    ]
+
+
+def test_extract_products_from_parsed_tree():
+    tree = html_parser.parse_html(_PAGE_HTML)
+
+    assert html_parser.extract_products(
+        tree, ".item", _FIELDS
+    ) == html_parser.extract_products(_PAGE_HTML, ".item", _FIELDS)
+    assert html_parser.extract_products(tree, ".missing", _FIELDS) == []
+
+
+def test_extract_products_from_product_outer_html():
+    # the product element itself matches the product selector, as with its outerHTML
+    products = html_parser.extract_products(
+        '<li class="item"><a class="title" href="/product/2">Laptop</a></li>',
+        ".item",
+        _FIELDS,
+    )
+
+    assert products == [
+        {"title": "Laptop", "link": "/product/2", "price": None, "rating": None}
+    ]
+
+
+def test_extract_products_resolves_relative_urls():
+    # relative links are resolved against the page URL, as the href property in the browser
+    products = html_parser.extract_products(
+        _PAGE_HTML, ".item", _FIELDS, "https://www.example.com/s?k=laptop"
+    )
+
+    assert [product["link"] for product in products] == [
+        "https://www.example.com/product/1",
+        None,
+    ]
+    assert products[0]["price"] == "$1,299.99"
+
+
+def test_select_texts():
+    assert html_parser.select_texts(_PAGE_HTML, ".paging .page") == ["1", "2"]
+    assert html_parser.select_texts(
+        html_parser.parse_html(_PAGE_HTML), ".paging .page"
+    ) == ["1", "2"]
+    assert html_parser.select_texts(_PAGE_HTML, ".missing") == []
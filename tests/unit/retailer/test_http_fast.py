@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from price_scraper.retailer import http_fast
+
+_AsyncClient = httpx.AsyncClient
+
+
+def _mock_transport(handler):
+    """Patches the fetch_pages client to send its requests to the handler."""
+    return patch.object(
+        http_fast.httpx,
+        "AsyncClient",
+        lambda **kwargs: _AsyncClient(transport=httpx.MockTransport(handler), **kwargs),
+    )
+
+
+def test_fetch_pages():
+    def handler(request: httpx.Request) -> httpx.Response:
+        # requests look like they come from a web browser
+        assert request.headers["User-Agent"] == http_fast._HEADERS["User-Agent"]
+        if request.url.path == "/ok":
+            return httpx.Response(200, text="<html>ok</html>")
+        if request.url.path == "/missing":
+            return httpx.Response(404, text="<html>missing</html>")
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with _mock_transport(handler):
+        pages = http_fast.fetch_pages(
+            [
+                "https://retailer.com/ok",
+                "https://retailer.com/missing",
+                "https://retailer.com/error",
+            ],
+            timeout=1,
+        )
+
+    # pages are in the order of urls, failed pages are None
+    assert pages == ["<html>ok</html>", None, None]
+
+
+def test_fetch_pages_without_urls():
+    with _mock_transport(lambda request: pytest.fail("no request is sent")):
+        assert http_fast.fetch_pages([], timeout=1) == []
+
+
+@pytest.mark.parametrize(
+    "proxy_kwargs, proxy",
+    [
+        (None, None),
+        ({}, None),
+        ({"sslProxy": "<PROXY>:8080"}, "http://<PROXY>:8080"),
+        ({"httpProxy": "socks5://<PROXY>:1080"}, "socks5://<PROXY>:1080"),
+    ],
+)
+def test__get_proxy(proxy_kwargs, proxy):
+    assert http_fast._get_proxy(proxy_kwargs) == proxy
@@ -1,35 +1,68 @@
+from datetime import date
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import SQLAlchemyError
 
+from price_scraper.enums import Retailer
+from price_scraper.models import ProductMetadataBatch, ProductPriceBatch
 from price_scraper.storage import postgres
 
 
 @patch.dict(
     os.environ, {"POSTGRES_USER": "user", "POSTGRES_PASSWORD": "pass"}, clear=True
 )
+@patch.object(postgres, "_created_databases", set())
 @patch(postgres.__name__ + ".Base")
 @patch(postgres.__name__ + ".sessionmaker")
 @patch(postgres.__name__ + ".create_engine")
-@patch(postgres.__name__ + ".Index")
-def test_postgres(mock_index, mock_create_engine, mock_session_maker, mock_model_base):
+def test_postgres(mock_create_engine, mock_session_maker, mock_model_base):
     # test __init__
     storage = postgres.PostgresStorage()
 
-    assert mock_index.call_count == 4
     mock_create_engine.assert_called_once()
+    assert (
+        mock_create_engine.call_args.kwargs["executemany_mode"] == "values_plus_batch"
+    )
     mock_session_maker.assert_called_once()
     mock_model_base.metadata.create_all.assert_called_once()
+    # tables are only created once per database
+    postgres.PostgresStorage()
+    mock_model_base.metadata.create_all.assert_called_once()
 
     # test save success
-    mock_product_meta = [MagicMock()]
-    mock_product_data = MagicMock()
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1"],
+        retailer=[Retailer.AMZ],
+        brand=["brand"],
+        category=["category"],
+        title=["title"],
+        additional_attributes=[None],
+    )
+    mock_product_data = ProductPriceBatch(
+        id=["1"],
+        product_id=["AMZ1"],
+        date=[date(2024, 2, 4)],
+        buy_price=[1.0],
+        original_price=[None],
+        coupon_value=[None],
+        rating=[None],
+        review_count=[None],
+    )
     mock_session = mock_session_maker.return_value.return_value
     storage.save(product_prices=mock_product_data, product_metadata=mock_product_meta)
 
-    mock_session.merge.assert_called_once_with(mock_product_meta[0])
-    mock_session.add_all.assert_called_once_with(mock_product_data)
+    mock_session.merge.assert_not_called()
+    assert mock_session.execute.call_count == 2
+    upsert_stmt = mock_session.execute.call_args_list[0].args[0]
+    assert upsert_stmt.table.name == "product_metadata"
+    upsert_sql = str(upsert_stmt.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (product_id) DO UPDATE" in upsert_sql
+    # unchanged rows are not rewritten
+    assert "IS DISTINCT FROM" in upsert_sql
+    assert "CAST(excluded.additional_attributes AS JSONB)" in upsert_sql
+    assert mock_session.execute.call_args.args[1] == list(mock_product_data.rows())
     mock_session.commit.assert_called_once()
     mock_session.rollback.assert_not_called()
 
@@ -37,3 +70,7 @@ def test_postgres(mock_index, mock_create_engine, mock_session_maker, mock_model
     mock_session.commit.side_effect = SQLAlchemyError
     storage.save(product_prices=mock_product_data, product_metadata=mock_product_meta)
     mock_session.rollback.assert_called_once()
+
+    # test close
+    storage.close()
+    mock_session.close.assert_called_once()
@@ -1,32 +1,87 @@
-from unittest.mock import MagicMock, patch
+from datetime import date
+from unittest.mock import patch
 
-from sqlalchemy.exc import SQLAlchemyError
+import duckdb
+import pyarrow as pa
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
 import pytest
 
+from price_scraper.enums import Retailer
+from price_scraper.models import ProductMetadataBatch, ProductPriceBatch
 from price_scraper.storage import s3
 
 
 @pytest.fixture
-@patch("boto3.Session")
-@patch(s3.__name__ + ".text")
-@patch(s3.__name__ + ".Base")
-@patch(s3.__name__ + ".sessionmaker")
-@patch(s3.__name__ + ".create_engine")
-def storage(
-    mock_create_engine, mock_session_maker, mock_model_base, mock_text, mock_boto3
-):
-    return s3.S3Storage(bucket_and_prefix="s3://<bucket>/<prefix>", region="<region>")
+@patch.dict(s3._databases, clear=True)
+@patch(s3.__name__ + ".fs")
+@patch("duckdb.connect")
+def storage(mock_connect, mock_fs):
+    return s3.S3Storage(bucket_and_prefix="s3://<bucket>/<prefix>", region="us-east-1")
 
 
 def test_init(storage):
-    assert storage.session.execute.call_count == 4
+    # nothing is set up on the storage connection
+    storage.connection.execute.assert_not_called()
+
+
+def test_close(storage):
+    storage.close()
+
+    storage.connection.close.assert_called_once()
+
+
+@patch.dict(s3._databases, clear=True)
+@patch(s3.__name__ + ".fs")
+@patch("duckdb.connect")
+def test_init_reuses_database(mock_connect, mock_fs):
+    database = mock_connect.return_value
+
+    s3.S3Storage(bucket_and_prefix="s3://<bucket>/<prefix>", region="us-east-1")
+    s3.S3Storage(bucket_and_prefix="s3://<bucket>/<prefix>", region="us-east-1")
+
+    # database created and the extensions loaded once for the region, with a connection per
+    # storage and the S3 secret replaced for each storage, so the credentials are refreshed
+    mock_connect.assert_called_once_with(":memory:")
+    assert database.execute.call_count == 3
+    assert database.execute.call_args_list[0].args[0] == "LOAD httpfs; LOAD aws;"
+    for call in database.execute.call_args_list[1:]:
+        assert call.args[0].startswith("CREATE OR REPLACE SECRET s3_storage ")
+    assert database.cursor.call_count == 2
+
+
+@patch.dict(s3._databases, clear=True)
+@patch(s3.__name__ + ".fs")
+@patch("duckdb.connect")
+@pytest.mark.parametrize("region", ["us-east-1', KEY_ID 'key", "us-east-1\n", ""])
+def test_init_rejects_invalid_region(mock_connect, mock_fs, region):
+    with pytest.raises(ValueError, match="Invalid S3 region"):
+        s3.S3Storage(bucket_and_prefix="s3://<bucket>/<prefix>", region=region)
+
+    mock_connect.assert_not_called()
 
 
 @patch.object(s3.S3Storage, "_save_metadata")
 @patch.object(s3.S3Storage, "_save_prices")
 def test_save(mock_save_prices, mock_save_metadata, storage):
-    mock_product_meta = [MagicMock()]
-    mock_product_data = MagicMock()
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1"],
+        retailer=[Retailer.AMZ],
+        brand=["brand"],
+        category=["category"],
+        title=["title"],
+        additional_attributes=[None],
+    )
+    mock_product_data = ProductPriceBatch(
+        id=["1"],
+        product_id=["AMZ1"],
+        date=[date(2024, 2, 4)],
+        buy_price=[1.0],
+        original_price=[None],
+        coupon_value=[None],
+        rating=[None],
+        review_count=[None],
+    )
 
     storage.save(product_prices=mock_product_data, product_metadata=mock_product_meta)
 
@@ -34,54 +89,248 @@ def test_save(mock_save_prices, mock_save_metadata, storage):
     mock_save_metadata.assert_called_once()
 
 
-def test__save_metadata(storage):
-    mock_product_meta = [MagicMock()]
-    storage.session.execute.reset_mock()
+@patch(s3.__name__ + ".pq")
+def test__save_metadata(mock_pq, storage):
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1"],
+        retailer=[Retailer.AMZ],
+        brand=["brand"],
+        category=["category"],
+        title=["title"],
+        additional_attributes=[None],
+    )
+    storage.connection.execute.reset_mock()
+    # merged product metadata, with an existing product and a changed product
+    storage.connection.execute.return_value.arrow.return_value = pa.table(
+        {
+            **{
+                name: ["AMZ0", "AMZ1"] if name == "product_id" else [name, name]
+                for name in s3._META_COLUMNS
+            },
+            "changed": [False, True],
+        }
+    )
+
+    num_updated = storage._save_metadata(
+        category="category",
+        brand="brand",
+        product_metadata=mock_product_meta,
+    )
+
+    # a single merge statement reading the existing file, the merged table is written by Arrow
+    storage.connection.execute.assert_called_once_with(
+        s3._MERGE_META_SQL, ["s3://<bucket>/<prefix>/category/brand/metadata.parquet"]
+    )
+    assert num_updated == 1
+    incoming_meta = storage.connection.register.call_args.args[1]
+    assert incoming_meta.to_pylist() == [
+        {
+            "product_id": "AMZ1",
+            "retailer": "AMZ",
+            "brand": "brand",
+            "category": "category",
+            "title": "title",
+            "additional_attributes": None,
+        }
+    ]
+    storage.connection.unregister.assert_called_once_with("incoming_meta")
+    mock_pq.write_table.assert_called_once()
+    written_meta = mock_pq.write_table.call_args.args[0]
+    assert written_meta.schema == s3._META_SCHEMA
+    assert written_meta.column("product_id").to_pylist() == ["AMZ0", "AMZ1"]
+    assert (
+        mock_pq.write_table.call_args.args[1]
+        == "<bucket>/<prefix>/category/brand/metadata.parquet"
+    )
+
+    # test unchanged metadata skips the write
+    mock_pq.write_table.reset_mock()
+    storage.connection.execute.return_value.arrow.return_value = pa.table(
+        {**{name: ["AMZ1"] for name in s3._META_COLUMNS}, "changed": [False]}
+    )
+    num_updated = storage._save_metadata(
+        category="category",
+        brand="brand",
+        product_metadata=mock_product_meta,
+    )
+    assert num_updated == 0
+    mock_pq.write_table.assert_not_called()
 
-    storage._save_metadata(
+    # test failing to merge existing metadata skips the write
+    storage.connection.execute.side_effect = duckdb.Error
+    num_updated = storage._save_metadata(
         category="category",
         brand="brand",
         product_metadata=mock_product_meta,
     )
+    assert num_updated == 0
+    mock_pq.write_table.assert_not_called()
+
 
-    assert storage.session.query.call_count == 1
-    assert storage.session.execute.call_count == 2
-    assert storage.session.commit.call_count == 2
+@patch(s3.__name__ + ".pq")
+def test__save_metadata_without_existing_metadata(mock_pq, storage):
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1"],
+        retailer=[Retailer.AMZ],
+        brand=["brand"],
+        category=["category"],
+        title=["title"],
+        additional_attributes=[None],
+    )
+    storage.filesystem.get_file_info.return_value.type = s3.fs.FileType.NotFound
+    storage.connection.execute.reset_mock()
 
-    # test rollback
-    storage.session.commit.side_effect = SQLAlchemyError
-    storage._save_metadata(
+    num_updated = storage._save_metadata(
         category="category",
         brand="brand",
         product_metadata=mock_product_meta,
     )
-    assert storage.session.rollback.call_count == 2
 
+    # the scraped metadata is written as is, without reading the missing file
+    storage.connection.execute.assert_not_called()
+    assert num_updated == 1
+    mock_pq.write_table.assert_called_once()
+
+
+def test__merge_metadata_deduplicates_products(storage):
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1", "AMZ2", "AMZ1"],
+        retailer=[Retailer.AMZ] * 3,
+        brand=["brand"] * 3,
+        category=["category"] * 3,
+        title=["old", "title", "new"],
+        additional_attributes=[None, None, {"color": "red"}],
+    )
+    storage.filesystem.get_file_info.return_value.type = s3.fs.FileType.NotFound
+
+    incoming_meta, num_updated = storage._merge_metadata(
+        mock_product_meta, "s3://<bucket>/<prefix>/category/brand/metadata.parquet"
+    )
+
+    assert num_updated == 2
+    assert incoming_meta.column("product_id").to_pylist() == ["AMZ1", "AMZ2"]
+    assert incoming_meta.column("title").to_pylist() == ["new", "title"]
+    assert incoming_meta.column("additional_attributes").to_pylist() == [
+        '{"color": "red"}',
+        None,
+    ]
 
-def test__save_prices(storage):
-    mock_product_prices = MagicMock()
-    retailer_enum = MagicMock()
-    storage.session.execute.reset_mock()
+
+def test__merge_metadata_with_duckdb(storage, tmp_path):
+    meta_parquet_path = str(tmp_path / "metadata.parquet")
+    pq.write_table(
+        pa.Table.from_pylist(
+            [
+                {
+                    "product_id": product_id,
+                    "retailer": "AMZ",
+                    "brand": "brand",
+                    "category": "category",
+                    "title": title,
+                    "additional_attributes": additional_attributes,
+                }
+                for product_id, title, additional_attributes in [
+                    ("AMZ1", "old", None),
+                    ("AMZ2", "same", '{"color":"blue"}'),
+                    ("AMZ3", "kept", None),
+                ]
+            ],
+            schema=s3._META_SCHEMA,
+        ),
+        meta_parquet_path,
+    )
+    mock_product_meta = ProductMetadataBatch(
+        product_id=["AMZ1", "AMZ2", "AMZ4"],
+        retailer=[Retailer.AMZ] * 3,
+        brand=["brand"] * 3,
+        category=["category"] * 3,
+        title=["new", "same", "added"],
+        additional_attributes=[{"color": "red"}, {"color": "blue"}, None],
+    )
+    storage.connection = duckdb.connect(":memory:")
+    storage.filesystem = fs.LocalFileSystem()
+
+    merged_meta, num_updated = storage._merge_metadata(
+        mock_product_meta, meta_parquet_path
+    )
+
+    # a changed and a new product, the unchanged and the existing only products are kept as
+    # they were read, the attributes compared as JSON
+    assert num_updated == 2
+    assert merged_meta.schema == s3._META_SCHEMA
+    assert sorted(merged_meta.to_pylist(), key=lambda row: row["product_id"]) == [
+        {
+            "product_id": product_id,
+            "retailer": "AMZ",
+            "brand": "brand",
+            "category": "category",
+            "title": title,
+            "additional_attributes": additional_attributes,
+        }
+        for product_id, title, additional_attributes in [
+            ("AMZ1", "new", '{"color": "red"}'),
+            ("AMZ2", "same", '{"color":"blue"}'),
+            ("AMZ3", "kept", None),
+            ("AMZ4", "added", None),
+        ]
+    ]
+
+    # test unchanged products only are not counted as updated
+    _, num_updated = storage._merge_metadata(
+        ProductMetadataBatch(
+            product_id=["AMZ2"],
+            retailer=[Retailer.AMZ],
+            brand=["brand"],
+            category=["category"],
+            title=["same"],
+            additional_attributes=[{"color": "blue"}],
+        ),
+        meta_parquet_path,
+    )
+    assert num_updated == 0
+
+
+@patch(s3.__name__ + ".ds.write_dataset")
+def test__save_prices(mock_write_dataset, storage):
+    mock_product_prices = ProductPriceBatch(
+        id=["1"],
+        product_id=["AMZ1"],
+        date=[date(2024, 2, 4)],
+        buy_price=[1.0],
+        original_price=[None],
+        coupon_value=[None],
+        rating=[None],
+        review_count=[None],
+    )
+    storage.connection.execute.reset_mock()
 
     storage._save_prices(
         product_prices=mock_product_prices,
         category="category",
         brand="brand",
-        retailer=retailer_enum,
-        dt=MagicMock(),
+        retailer=Retailer.AMZ,
+        dt=date(2024, 2, 4),
     )
 
-    assert storage.session.add_all.call_count == 1
-    assert storage.session.execute.call_count == 1
-    assert storage.session.commit.call_count == 2
+    # written straight from the Arrow table as a hive partitioned dataset, without DuckDB
+    storage.connection.execute.assert_not_called()
+    incoming_prices, prices_path = mock_write_dataset.call_args.args
+    assert prices_path == "<bucket>/<prefix>/category/brand/prices"
+    assert incoming_prices.select(
+        ["buy_price", "year", "month", "retailer"]
+    ).to_pylist() == [{"buy_price": 1.0, "year": 2024, "month": 2, "retailer": "AMZ"}]
+    assert mock_write_dataset.call_args.kwargs["filesystem"] is storage.filesystem
+    assert (
+        mock_write_dataset.call_args.kwargs["existing_data_behavior"]
+        == "delete_matching"
+    )
 
-    # test rollback
-    storage.session.commit.side_effect = SQLAlchemyError
+    # test write failure is logged
+    mock_write_dataset.side_effect = OSError
     storage._save_prices(
         product_prices=mock_product_prices,
         category="category",
         brand="brand",
-        retailer=retailer_enum,
-        dt=MagicMock(),
+        retailer=Retailer.AMZ,
+        dt=date(2024, 2, 4),
     )
-    assert storage.session.rollback.call_count == 2
@@ -0,0 +1,178 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from price_scraper import cli
+from price_scraper.enums import Retailer, StorageType
+from price_scraper.models import ProductMetadataBatch, ProductPriceBatch
+from price_scraper.storage import s3
+
+
+@patch.dict(s3._databases, clear=True)
+@patch.object(s3.S3Storage, "save")
+@patch(s3.__name__ + ".fs")
+@patch("duckdb.connect")
+@patch(cli.__name__ + ".logger")
+def test__save_one_s3(mock_logger, mock_connect, mock_fs, mock_save):
+    scraper = MagicMock(
+        product_prices=ProductPriceBatch(
+            id=["1"],
+            product_id=["AMZ1"],
+            date=[date(2024, 2, 4)],
+            buy_price=[1.0],
+            original_price=[None],
+            coupon_value=[None],
+            rating=[None],
+            review_count=[None],
+        ),
+        product_metadata=ProductMetadataBatch(
+            product_id=["AMZ1"],
+            retailer=[Retailer.AMZ],
+            brand=["brand"],
+            category=["category"],
+            title=["title"],
+            additional_attributes=[None],
+        ),
+    )
+    storage_config = cli.StorageOptions(
+        storage_type="S3",
+        storage_options={"bucket_and_prefix": "s3://<bucket>", "region": "us-east-1"},
+    )
+    cursor = mock_connect.return_value.cursor.return_value
+
+    cli._save_one(storage_config, scraper)
+
+    mock_save.assert_called_once_with(
+        product_prices=scraper.product_prices,
+        product_metadata=scraper.product_metadata,
+    )
+    mock_logger.error.assert_not_called()
+    # the storage cursor is closed, and the shared region database kept open
+    cursor.close.assert_called_once()
+    mock_connect.return_value.close.assert_not_called()
+
+    # test the storage is closed when save fails
+    cursor.close.reset_mock()
+    mock_save.side_effect = OSError
+    cli._save_one(storage_config, scraper)
+    mock_logger.error.assert_called_once()
+    cursor.close.assert_called_once()
+
+
+def test_price_scraper_schema():
+    event = cli.PriceScraperSchema(
+        retailer="AMZ",
+        url="<URL>",
+        category="category",
+        brand="brand",
+        storage_config=[
+            {"storage_type": "S3", "storage_options": {"region": "us-east-1"}},
+            cli.StorageOptions(storage_type=StorageType.POSTGRES),
+        ],
+    )
+
+    # enum names are validated into members, and storage configs into StorageOptions
+    assert event.retailer is Retailer.AMZ
+    assert event.storage_config == [
+        cli.StorageOptions(
+            storage_type=StorageType.S3, storage_options={"region": "us-east-1"}
+        ),
+        cli.StorageOptions(storage_type=StorageType.POSTGRES, storage_options={}),
+    ]
+    assert event.proxy_config == {}
+    assert event.timeout == 30
+    assert event.max_workers == 4
+    assert event.fast_path is False
+
+
+@pytest.mark.parametrize(
+    "kwargs, error, match",
+    [
+        (
+            {"retailer": "WMT"},
+            ValueError,
+            "No such enum: WMT. Supported enum are: BASE, AMZ, BBY",
+        ),
+        (
+            {"storage_config": [{"storage_type": "GCS"}]},
+            ValueError,
+            "No such enum: GCS. Supported enum are: S3, POSTGRES",
+        ),
+        ({"storage_config": [{}]}, TypeError, "storage_type"),
+    ],
+)
+def test_price_scraper_schema_rejects_invalid_event(kwargs, error, match):
+    event = {
+        "retailer": "AMZ",
+        "url": "<URL>",
+        "category": "category",
+        "brand": "brand",
+        "storage_config": [],
+        **kwargs,
+    }
+    with pytest.raises(error, match=match):
+        cli.PriceScraperSchema(**event)
+
+
+def test_price_scraper_schema_rejects_missing_field():
+    with pytest.raises(
+        TypeError,
+        match="missing 2 required positional arguments: 'brand' and 'storage_config'",
+    ):
+        cli.PriceScraperSchema(retailer="AMZ", url="<URL>", category="category")
+
+
+@patch(cli.__name__ + ".configure_logging")
+@patch(cli.__name__ + ".store")
+@patch(cli.__name__ + ".scrape")
+def test_main(mock_scrape, mock_store, mock_configure_logging):
+    argv = [
+        "price_scraper",
+        "--retailer",
+        "BBY",
+        "--url",
+        "<URL>",
+        "--category",
+        "category",
+        "--brand",
+        "brand",
+        "--storage-config",
+        '{"storage_type": "S3", "storage_options": {"region": "us-east-1"}}',
+        '{"storage_type": "POSTGRES"}',
+        "--timeout",
+        "10",
+        "--fast-path",
+    ]
+    with patch("sys.argv", argv):
+        cli.main()
+
+    # the parsed options round trip into the schema, with the defaults of missing options
+    mock_scrape.assert_called_once_with(
+        event=cli.PriceScraperSchema(
+            retailer=Retailer.BBY,
+            url="<URL>",
+            category="category",
+            brand="brand",
+            storage_config=[
+                cli.StorageOptions(
+                    storage_type=StorageType.S3,
+                    storage_options={"region": "us-east-1"},
+                ),
+                cli.StorageOptions(storage_type=StorageType.POSTGRES),
+            ],
+            proxy_config={},
+            timeout=10,
+            max_workers=4,
+            fast_path=True,
+        )
+    )
+    mock_store.assert_called_once_with(
+        scraper=mock_scrape.return_value, event=mock_scrape.call_args.kwargs["event"]
+    )
+
+
+def test_create_arg_parser_requires_fields():
+    with patch("sys.argv", ["price_scraper", "--retailer", "AMZ"]):
+        with pytest.raises(SystemExit):
+            cli.PriceScraperSchema.create_arg_parser()
@@ -0,0 +1,39 @@
+import pytest
+
+from price_scraper.enums import Retailer, StorageType
+
+
+def test_getitem():
+    assert Retailer.__getitem__("AMZ") is Retailer.AMZ
+    assert StorageType.__getitem__("S3") is StorageType.S3
+
+
+@pytest.mark.parametrize(
+    "enum_cls, name, names",
+    [
+        (Retailer, "WMT", "BASE, AMZ, BBY"),
+        (StorageType, "GCS", "S3, POSTGRES"),
+    ],
+)
+def test_getitem_rejects_unknown_name(enum_cls, name, names):
+    with pytest.raises(ValueError) as e:
+        enum_cls.__getitem__(name)
+
+    # the supported names are of the enum class, without the KeyError chained
+    assert str(e.value) == f"No such enum: {name}. Supported enum are: {names}"
+    assert e.value.__cause__ is None
+    assert e.value.__suppress_context__
+
+
+def test_validate():
+    # enum names and members are both accepted
+    assert Retailer.validate("BBY") is Retailer.BBY
+    assert Retailer.validate(Retailer.BBY) is Retailer.BBY
+    with pytest.raises(ValueError, match="No such enum: StorageType.S3"):
+        Retailer.validate(StorageType.S3)
+
+
+def test_load():
+    from price_scraper.storage.postgres import PostgresStorage
+
+    assert StorageType.POSTGRES.load() is PostgresStorage